@@ -8,15 +8,254 @@ This module provides functionality to:
 4. Export results to CSV
 """
 
+import math
+import re
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import astuple, dataclass, field
 from pathlib import Path
 import logging
 
 
-@dataclass
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional, the NumPy scorer is used without it
+    njit = None
+
+try:
+    import numexpr as ne
+except ImportError:  # numexpr is optional, plain NumPy expressions are used without it
+    ne = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # PyArrow is optional, pandas' CSV reader is used without it
+    pa = None
+
+
+# Text values treated as True when cleaning boolean columns
+TRUE_TOKENS = frozenset({'yes', 'ja', 'true', '1', 'finns', 'hiss', 'y'})
+
+# Matches everything that is not part of a plain decimal number
+_NUM_RE = re.compile(r'[^\d.]')
+
+# First whole number in a string, mirrors pidgeon.items.parse_integer
+_INT_RE = re.compile(r'(\d+)')
+
+# Numeric columns that hold whole numbers and can be downcast to small ints
+_INTEGER_COLS = frozenset({'year_built', 'floor', 'total_floors'})
+
+# Free-text columns, stored as Arrow strings instead of Python objects
+_TEXT_COLS = ('url', 'source', 'address', 'housing_cooperative', 'scraped_at')
+
+# pandas 3.0 always uses Copy-on-Write, so a shallow copy shares column
+# buffers with its source until a column is replaced. On pandas 2 writes to a
+# shallow copy reach the source frame, so clean_data copies deeply there.
+_COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3
+
+# Column types for scraped CSV files, as PyArrow type names for the CSV
+# reader. Text columns are pinned too, so that values such as scraped_at are
+# kept verbatim instead of being parsed into timestamps and exported in
+# another format.
+_CSV_DTYPES = {
+    'price': 'double',
+    'fee': 'double',
+    'price_per_m2': 'double',
+    'rooms': 'double',
+    'year_built': 'int16',
+    'floor': 'int8',
+    'total_floors': 'int8',
+    'url': 'string',
+    'source': 'string',
+    'address': 'string',
+    'housing_cooperative': 'string',
+    'scraped_at': 'string',
+    'hemnet_id': 'string',
+    'listing_type': 'string',
+    'booli_id': 'string',
+    'listing_status': 'string',
+}
+
+
+def _pandas_dtype(arrow_type):
+    """
+    Pick the pandas dtype for a column read by the PyArrow CSV reader.
+
+    Floats become NumPy float64, which the scorer reads without copying,
+    integers become nullable pandas integers and everything else stays
+    Arrow-backed.
+    """
+    if pa.types.is_floating(arrow_type):
+        return None
+    if pa.types.is_integer(arrow_type):
+        prefix = 'UInt' if pa.types.is_unsigned_integer(arrow_type) else 'Int'
+        return pd.api.types.pandas_dtype(f'{prefix}{arrow_type.bit_width}')
+    return pd.ArrowDtype(arrow_type)
+
+
+def _make_linear_decay(min_acc: float, max_pref: float, floor_tail: float = 0.3,
+                       neutral: float = 0.5) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Build a vectorized "lower is better" scorer for price, fee and price per m2.
+
+    Values up to ``max_pref`` are scored linearly (1.0 at ``min_acc``), values
+    above it decay exponentially from ``floor_tail``. Missing values get the
+    ``neutral`` score. The preference constants are bound once so the returned
+    function only does array arithmetic.
+    """
+    min_acc = float(min_acc)
+    max_pref = float(max_pref)
+    span = max_pref - min_acc
+
+    if ne is not None:
+        # numexpr evaluates the whole expression in one blocked, multi-threaded pass
+        linear = '(1.0 - (arr - min_acc) / span)'
+        expr = ('where(arr != arr, neutral, where(arr <= max_pref, '
+                f'where({linear} < 0, 0.0, where({linear} > 1, 1.0, {linear})), '
+                'floor_tail * exp(-(arr - max_pref) / max_pref)))')
+        constants = {'min_acc': min_acc, 'max_pref': max_pref, 'span': span,
+                     'floor_tail': float(floor_tail), 'neutral': float(neutral)}
+
+        def score(arr: np.ndarray) -> np.ndarray:
+            return ne.evaluate(expr, local_dict={'arr': arr, **constants})
+
+        return score
+
+    def score(arr: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            linear = np.clip(1.0 - (arr - min_acc) / span, 0.0, 1.0)
+            decay = np.clip(floor_tail * np.exp(-(arr - max_pref) / max_pref),
+                            0.0, None)
+        return np.where(np.isnan(arr), neutral,
+                        np.where(arr <= max_pref, linear, decay))
+
+    return score
+
+
+def _column_values(df: pd.DataFrame, col: str) -> np.ndarray:
+    """
+    Return a column as a float64 array, NaN-filled if the column is absent.
+
+    Cleaned float64 columns are returned as a read-only view of the column's
+    buffer instead of a copy, the scorers never write to their inputs.
+    """
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    s = df[col]
+    if s.dtype == np.float64:
+        return s.to_numpy(dtype=np.float64, copy=False)
+    if pd.api.types.is_numeric_dtype(s):
+        return s.to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.to_numeric(s, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+if njit is not None:
+    # fastmath without 'nnan'/'ninf' so the NaN checks for missing data are kept
+    _FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+    @njit(cache=True, fastmath=_FASTMATH, error_model='numpy')
+    def _linear_decay_scalar(x, min_acc, max_pref, floor_tail, neutral):
+        if np.isnan(x):
+            return neutral
+        if x <= max_pref:
+            return min(1.0, max(0.0, 1.0 - (x - min_acc) / (max_pref - min_acc)))
+        return max(0.0, floor_tail * np.exp(-(x - max_pref) / max_pref))
+
+    @njit(cache=True, parallel=True, fastmath=_FASTMATH, error_model='numpy')
+    def _score_kernel(price, fee, price_per_m2, rooms, year_built, floor,
+                      has_elevator, has_balcony, weights,
+                      min_acc_price, max_pref_price, min_acc_fee, max_pref_fee,
+                      min_acc_price_per_m2, max_pref_price_per_m2,
+                      min_pref_rooms, max_pref_rooms,
+                      min_pref_year, pref_year_threshold,
+                      avoid_ground_floor, has_floor_pref,
+                      pref_min_floor, pref_max_floor):
+        """Fused per-apartment scoring loop, see ApartmentAnalyzer.score_all."""
+        w_price, w_fee, w_price_per_m2 = weights[0], weights[1], weights[2]
+        w_rooms, w_year_built, w_floor = weights[3], weights[4], weights[5]
+        w_elevator, w_balcony = weights[6], weights[7]
+        n = price.shape[0]
+        out = np.empty(n)
+        for i in prange(n):
+            score = w_price * _linear_decay_scalar(
+                price[i], min_acc_price, max_pref_price, 0.3, 0.0)
+            score += w_fee * _linear_decay_scalar(
+                fee[i], min_acc_fee, max_pref_fee, 0.3, 0.5)
+            score += w_price_per_m2 * _linear_decay_scalar(
+                price_per_m2[i], min_acc_price_per_m2, max_pref_price_per_m2, 0.2, 0.5)
+
+            r = rooms[i]
+            if np.isnan(r):
+                s = 0.5
+            elif min_pref_rooms <= r <= max_pref_rooms:
+                s = 1.0
+            elif r < min_pref_rooms:
+                s = max(0.0, r / min_pref_rooms)
+            else:
+                s = max(0.1, 1.0 - 0.1 * (r - max_pref_rooms))
+            score += w_rooms * s
+
+            y = year_built[i]
+            if np.isnan(y):
+                s = 0.5
+            elif y >= pref_year_threshold:
+                s = 1.0
+            elif y >= min_pref_year:
+                s = (y - min_pref_year) / (pref_year_threshold - min_pref_year)
+                s = max(0.1, s)
+            else:
+                s = 0.1
+            score += w_year_built * s
+
+            f = floor[i]
+            if np.isnan(f):
+                s = 0.5
+            elif avoid_ground_floor and f <= 1:
+                s = 0.2
+            elif has_floor_pref:
+                if pref_min_floor <= f <= pref_max_floor:
+                    s = 1.0
+                elif f < pref_min_floor:
+                    s = 0.6
+                else:
+                    s = 0.7
+            else:
+                s = 0.8
+            score += w_floor * s
+
+            if has_elevator[i]:
+                score += w_elevator
+            if has_balcony[i]:
+                score += w_balcony
+
+            out[i] = min(1.0, score)
+        return out
+
+    # Numba compiles one specialization per readonly/writable mix of the input
+    # arrays, so score_all always passes read-only views. Compiling that single
+    # signature here (or loading it from the on-disk cache) keeps the compile
+    # time out of the first analysis.
+    _warmup_float = np.full(1, np.nan)
+    _warmup_bool = np.zeros(1, dtype=np.bool_)
+    _warmup_float.flags.writeable = False
+    _warmup_bool.flags.writeable = False
+    _score_kernel(*(_warmup_float,) * 6, _warmup_bool, _warmup_bool, np.zeros(8),
+                  *(1.0,) * 10, False, False, 0.0, 0.0)
+    del _warmup_float, _warmup_bool
+else:
+    _score_kernel = None
+
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    """Return a read-only view of arr, leaving arr itself writable."""
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+@dataclass(slots=True, frozen=True)
 class ScoringWeights:
     """
     Configuration class for apartment scoring weights.
@@ -42,15 +281,14 @@ class ScoringWeights:
 
     def __post_init__(self):
         """Validate that weights sum to approximately 1.0."""
-        total = (self.price_weight + self.fee_weight + self.price_per_m2_weight +
-                self.rooms_weight + self.year_built_weight + self.elevator_weight +
-                self.balcony_weight + self.floor_weight)
+        total = sum(astuple(self))
 
         if not (0.95 <= total <= 1.05):
-            logging.warning(f"Scoring weights sum to {total:.3f}, not close to 1.0")
+            logging.warning(f"Scoring weights sum to {total:.3f}, not close to 1.0, "
+                            f"ApartmentAnalyzer will normalize them")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ScoringPreferences:
     """
     Configuration class for apartment scoring preferences.
@@ -96,10 +334,44 @@ class ApartmentAnalyzer:
             weights: Scoring weights configuration
             preferences: Scoring preferences configuration
         """
-        self.weights = weights or ScoringWeights()
+        weights = weights or ScoringWeights()
+        # Rescale weights that do not sum to 1 once here, so every scorer
+        # keeps its sums in [0, 1] without dividing per call
+        total = sum(astuple(weights))
+        if total > 0 and not math.isclose(total, 1.0):
+            weights = ScoringWeights(*(weight / total for weight in astuple(weights)))
+        self.weights = weights
         self.preferences = preferences or ScoringPreferences()
         self.logger = logging.getLogger(__name__)
 
+        # Vectorized scorers with the preference constants bound in
+        p = self.preferences
+        self._score_price_vec = _make_linear_decay(
+            p.min_acceptable_price, p.max_preferred_price, 0.3, neutral=0.0)
+        self._score_fee_vec = _make_linear_decay(
+            p.min_acceptable_fee, p.max_preferred_fee, 0.3)
+        self._score_price_per_m2_vec = _make_linear_decay(
+            p.min_acceptable_price_per_m2, p.max_preferred_price_per_m2, 0.2)
+
+        # Plain-float copies of the configuration for the scoring hot path
+        w = self.weights
+        self._W = np.array([
+            w.price_weight, w.fee_weight, w.price_per_m2_weight, w.rooms_weight,
+            w.year_built_weight, w.floor_weight, w.elevator_weight, w.balcony_weight
+        ], dtype=np.float64)
+        # Same weights for the float32 sub-score matrix of the NumPy scorer
+        self._W32 = self._W.astype(np.float32)
+        self._P = (
+            float(p.min_acceptable_price), float(p.max_preferred_price),
+            float(p.min_acceptable_fee), float(p.max_preferred_fee),
+            float(p.min_acceptable_price_per_m2), float(p.max_preferred_price_per_m2),
+            float(p.min_preferred_rooms), float(p.max_preferred_rooms),
+            float(p.min_preferred_year), float(p.preferred_year_threshold),
+            bool(p.avoid_ground_floor),
+            bool(p.preferred_min_floor and p.preferred_max_floor),
+            float(p.preferred_min_floor or 0), float(p.preferred_max_floor or 0),
+        )
+
     def load_data(self, file_path: str) -> pd.DataFrame:
         """
         Load apartment data from CSV file.
@@ -111,7 +383,24 @@ class ApartmentAnalyzer:
             DataFrame with apartment data
         """
         try:
-            df = pd.read_csv(file_path)
+            df = None
+            if pa is not None:
+                # pandas' pyarrow engine only casts after inference, so the
+                # column types are handed to the PyArrow reader directly
+                convert_options = pa_csv.ConvertOptions(
+                    column_types={col: pa.type_for_alias(t)
+                                  for col, t in _CSV_DTYPES.items()},
+                    strings_can_be_null=True,
+                )
+                try:
+                    table = pa_csv.read_csv(file_path, convert_options=convert_options)
+                    df = table.to_pandas(types_mapper=_pandas_dtype)
+                except pa.ArrowInvalid as e:
+                    # The file does not match the expected schema
+                    self.logger.debug(
+                        f"PyArrow CSV reader failed ({e}), using default parser")
+            if df is None:
+                df = pd.read_csv(file_path)
             self.logger.info(f"Loaded {len(df)} apartments from {file_path}")
             return df
         except Exception as e:
@@ -128,33 +417,52 @@ class ApartmentAnalyzer:
         Returns:
             Cleaned DataFrame
         """
-        df_clean = df.copy()
+        df_clean = df.copy(deep=not _COPY_ON_WRITE)
 
         # Convert boolean columns
         for col in ['has_elevator', 'has_balcony']:
             if col in df_clean.columns:
-                df_clean[col] = df_clean[col].map({
-                    'Yes': True, 'No': False, 'yes': True, 'no': False,
-                    True: True, False: False, 1: True, 0: False
-                }).fillna(False)
+                s = df_clean[col]
+                if pd.api.types.is_bool_dtype(s):
+                    df_clean[col] = s.fillna(False).astype(bool)
+                elif pd.api.types.is_numeric_dtype(s):
+                    df_clean[col] = s.eq(1)
+                else:
+                    tokens = s.astype(str).str.strip().str.lower()
+                    df_clean[col] = tokens.isin(TRUE_TOKENS)
 
         # Convert numeric columns
         numeric_cols = ['price', 'fee', 'price_per_m2', 'rooms', 'year_built', 'floor', 'total_floors']
         for col in numeric_cols:
             if col in df_clean.columns:
-                # Remove non-numeric characters and convert
-                df_clean[col] = pd.to_numeric(
-                    df_clean[col].astype(str).str.replace(r'[^\d.]', '', regex=True),
-                    errors='coerce'
-                )
+                s = df_clean[col]
+                if not pd.api.types.is_numeric_dtype(s):
+                    if col in _INTEGER_COLS:
+                        # Take the first number, so "3 av 5" becomes floor 3
+                        s = s.astype(str).str.extract(_INT_RE, expand=False)
+                    else:
+                        # Remove non-numeric characters
+                        s = s.astype(str).str.replace(_NUM_RE, '', regex=True)
+                    s = pd.to_numeric(s, errors='coerce')
+                # Store whole-number columns in the narrowest integer dtype
+                if col in _INTEGER_COLS or pd.api.types.is_integer_dtype(s):
+                    s = pd.to_numeric(s, downcast='integer')
+                df_clean[col] = s
+
+        # Pack object text columns into contiguous Arrow buffers. From pandas
+        # 3.0 text columns already default to this.
+        if pa is not None:
+            for col in _TEXT_COLS:
+                if col in df_clean.columns and df_clean[col].dtype == object:
+                    df_clean[col] = df_clean[col].astype('string[pyarrow]')
 
         # Log data quality
         self.logger.info(f"Data cleaning complete. Shape: {df_clean.shape}")
-        for col in numeric_cols:
-            if col in df_clean.columns:
-                missing = df_clean[col].isna().sum()
-                if missing > 0:
-                    self.logger.warning(f"Missing values in {col}: {missing}")
+        cols_present = [col for col in numeric_cols if col in df_clean.columns]
+        na_counts = df_clean[cols_present].isna().sum()
+        missing = na_counts[na_counts > 0]
+        if not missing.empty:
+            self.logger.warning("Missing values: %s", missing.to_dict())
 
         return df_clean
 
@@ -281,12 +589,99 @@ class ApartmentAnalyzer:
 
         return min(1.0, score)  # Cap at 1.0
 
-    def analyze_apartments(self, df: pd.DataFrame) -> pd.DataFrame:
+    def score_all(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Calculate scores for all apartments at once.
+
+        Vectorized equivalent of calling calculate_apartment_score on each row.
+
+        Args:
+            df: DataFrame with apartment data
+
+        Returns:
+            float64 array of scores between 0 and 1, aligned with the rows of df
+        """
+        price = _column_values(df, 'price')
+        fee = _column_values(df, 'fee')
+        price_per_m2 = _column_values(df, 'price_per_m2')
+        rooms = _column_values(df, 'rooms')
+        year_built = _column_values(df, 'year_built')
+        floor = _column_values(df, 'floor')
+
+        # Building features (binary bonuses)
+        no_feature = np.zeros(len(df), dtype=np.bool_)
+        has_elevator = (df['has_elevator'].fillna(False).to_numpy(dtype=np.bool_)
+                        if 'has_elevator' in df.columns else no_feature)
+        has_balcony = (df['has_balcony'].fillna(False).to_numpy(dtype=np.bool_)
+                       if 'has_balcony' in df.columns else no_feature)
+
+        if _score_kernel is not None:
+            arrays = (price, fee, price_per_m2, rooms, year_built, floor,
+                      has_elevator, has_balcony)
+            return _score_kernel(*map(_readonly, arrays), self._W, *self._P)
+
+        (_, _, _, _, _, _, min_rooms, max_rooms, min_year, year_threshold,
+         avoid_ground_floor, has_floor_pref, min_floor, max_floor) = self._P
+
+        # One float32 column per sub-score, in the same order as the weights in _W
+        sub_scores = np.empty((len(df), 8), dtype=np.float32)
+
+        # Financial factors
+        sub_scores[:, 0] = self._score_price_vec(price)
+        sub_scores[:, 1] = self._score_fee_vec(fee)
+        sub_scores[:, 2] = self._score_price_per_m2_vec(price_per_m2)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Property characteristics
+            sub_scores[:, 3] = np.select(
+                [np.isnan(rooms),
+                 (rooms >= min_rooms) & (rooms <= max_rooms),
+                 rooms < min_rooms],
+                [0.5, 1.0, np.maximum(0.0, rooms / min_rooms)],
+                default=np.maximum(0.1, 1.0 - 0.1 * (rooms - max_rooms))
+            )
+            year_ramp = (year_built - min_year) / (year_threshold - min_year)
+            sub_scores[:, 4] = np.select(
+                [np.isnan(year_built),
+                 year_built >= year_threshold,
+                 year_built >= min_year],
+                [0.5, 1.0, np.maximum(0.1, year_ramp)],
+                default=0.1
+            )
+
+        floor_conditions = [np.isnan(floor)]
+        floor_choices = [0.5]
+        if avoid_ground_floor:
+            floor_conditions.append(floor <= 1)
+            floor_choices.append(0.2)
+        if has_floor_pref:
+            floor_conditions += [(floor >= min_floor) & (floor <= max_floor),
+                                 floor < min_floor]
+            floor_choices += [1.0, 0.6]
+            floor_default = 0.7
+        else:
+            floor_default = 0.8
+        sub_scores[:, 5] = np.select(floor_conditions, floor_choices,
+                                     default=floor_default)
+
+        sub_scores[:, 6] = has_elevator
+        sub_scores[:, 7] = has_balcony
+
+        # All sub-scores are weighted and summed in one matrix-vector product
+        score = sub_scores @ self._W32
+
+        # float64 like the Numba kernel, whichever path computed the scores
+        return np.minimum(score, 1.0, dtype=np.float64)  # Cap at 1.0
+
+    def analyze_apartments(self, df: pd.DataFrame,
+                           top_k: Optional[int] = None) -> pd.DataFrame:
         """
         Analyze and score all apartments in the DataFrame.
 
         Args:
             df: DataFrame with apartment data
+            top_k: Only keep the top_k best apartments. They are picked with a
+                partial sort, so the rest are never ordered. All are kept by default.
 
         Returns:
             DataFrame with added score column, sorted by score descending
@@ -296,20 +691,44 @@ class ApartmentAnalyzer:
 
         # Calculate scores
         self.logger.info("Calculating apartment scores...")
-        df_clean['score'] = df_clean.apply(self.calculate_apartment_score, axis=1)
+        df_clean['score'] = self.score_all(df_clean)
 
         # Sort by score (highest first)
-        df_scored = df_clean.sort_values('score', ascending=False).reset_index(drop=True)
+        if top_k is None:
+            df_scored = df_clean.sort_values('score', ascending=False).reset_index(drop=True)
+        else:
+            df_scored = self.top_k(df_clean, top_k).reset_index(drop=True)
 
         # Add ranking
         df_scored['rank'] = range(1, len(df_scored) + 1)
 
-        self.logger.info(f"Analysis complete. Best score: {df_scored['score'].max():.3f}")
-        self.logger.info(f"Worst score: {df_scored['score'].min():.3f}")
-        self.logger.info(f"Average score: {df_scored['score'].mean():.3f}")
+        # Statistics cover every scored apartment, also when only the top ones are kept
+        scores = df_clean['score']
+        self.logger.info(f"Analysis complete. Best score: {scores.max():.3f}")
+        self.logger.info(f"Worst score: {scores.min():.3f}")
+        self.logger.info(f"Average score: {scores.mean():.3f}")
 
         return df_scored
 
+    def top_k(self, df: pd.DataFrame, k: int = 5) -> pd.DataFrame:
+        """
+        Select the k highest scoring apartments without sorting the whole DataFrame.
+
+        Args:
+            df: DataFrame with a score column
+            k: Number of apartments to return
+
+        Returns:
+            The k best apartments, sorted by score descending
+        """
+        scores = df['score'].to_numpy()
+        if k >= len(scores):
+            order = np.argsort(-scores, kind='stable')
+        else:
+            idx = np.argpartition(-scores, k)[:k]
+            order = idx[np.argsort(-scores[idx], kind='stable')]
+        return df.iloc[order]
+
     def export_results(self, df: pd.DataFrame, output_path: str) -> None:
         """
         Export analyzed results to CSV.
@@ -321,10 +740,14 @@ class ApartmentAnalyzer:
         try:
             # Reorder columns to put score and rank first
             cols = ['rank', 'score', 'address', 'price', 'fee', 'price_per_m2', 'rooms', 'year_built']
-            remaining_cols = [col for col in df.columns if col not in cols]
-            df_export = df[cols + remaining_cols]
-
-            df_export.to_csv(output_path, index=False)
+            ordered = cols + [col for col in df.columns if col not in cols]
+            # With Copy-on-Write (pandas 3) the reindexed frame shares buffers with df
+            df_export = df.reindex(columns=ordered)
+
+            # pandas' writer is kept on purpose: PyArrow's writes booleans as
+            # true/false and quotes every string, which changes the file format
+            df_export.to_csv(output_path, index=False, chunksize=50_000,
+                             lineterminator='\n')
             self.logger.info(f"Results exported to {output_path}")
         except Exception as e:
             self.logger.error(f"Error exporting results: {e}")
@@ -340,20 +763,30 @@ class ApartmentAnalyzer:
         Returns:
             Dictionary with summary statistics
         """
+        # One aggregation pass over price and score instead of one per statistic
+        stats = df[['price', 'score']].agg(['mean', 'median', 'min', 'max', 'std'])
+        feature_cols = [col for col in ('has_elevator', 'has_balcony')
+                        if col in df.columns]
+        feature_counts = df[feature_cols].sum()
+        # Bucket to the nearest half room (listings use e.g. 2.5 rooms) so float
+        # noise does not create separate keys
+        rooms = (pd.to_numeric(df['rooms'], errors='coerce') * 2).round() / 2
+
         summary = {
             'total_apartments': len(df),
-            'average_score': df['score'].mean(),
-            'score_std': df['score'].std(),
+            'average_score': stats.loc['mean', 'score'],
+            'score_std': stats.loc['std', 'score'],
             'top_10_percent_threshold': df['score'].quantile(0.9),
             'price_stats': {
-                'mean': df['price'].mean(),
-                'median': df['price'].median(),
-                'min': df['price'].min(),
-                'max': df['price'].max()
+                'mean': stats.loc['mean', 'price'],
+                'median': stats.loc['median', 'price'],
+                'min': stats.loc['min', 'price'],
+                'max': stats.loc['max', 'price']
             },
-            'rooms_distribution': df['rooms'].value_counts().to_dict(),
-            'has_elevator_count': df['has_elevator'].sum() if 'has_elevator' in df.columns else 0,
-            'has_balcony_count': df['has_balcony'].sum() if 'has_balcony' in df.columns else 0,
+            'rooms_distribution': (rooms.value_counts(dropna=True)
+                                   .sort_index().to_dict()),
+            'has_elevator_count': feature_counts.get('has_elevator', 0),
+            'has_balcony_count': feature_counts.get('has_balcony', 0),
         }
 
         return summary
@@ -27,17 +27,18 @@ def analyze_command(args):
 
     # Initialize analyzer with custom weights if provided
     weights = ScoringWeights()
-    preferences = ScoringPreferences()
 
     # Override preferences if provided
+    overrides = {}
     if args.max_price:
-        preferences.max_preferred_price = args.max_price
+        overrides['max_preferred_price'] = args.max_price
     if args.max_fee:
-        preferences.max_preferred_fee = args.max_fee
+        overrides['max_preferred_fee'] = args.max_fee
     if args.min_rooms:
-        preferences.min_preferred_rooms = args.min_rooms
+        overrides['min_preferred_rooms'] = args.min_rooms
     if args.max_rooms:
-        preferences.max_preferred_rooms = args.max_rooms
+        overrides['max_preferred_rooms'] = args.max_rooms
+    preferences = ScoringPreferences(**overrides)
 
     analyzer = ApartmentAnalyzer(weights=weights, preferences=preferences)
 
@@ -63,9 +64,11 @@ def analyze_command(args):
         print(f"Apartments with balcony: {summary['has_balcony_count']}")
 
         print(f"\nTop 5 apartments:")
+        # analyze_apartments already sorted the frame by score
         top_5 = df_analyzed.head(5)[['rank', 'score', 'address', 'price', 'rooms']]
-        for _, apt in top_5.iterrows():
-            print(f"  {apt['rank']:2d}. {apt['address'][:50]:<50} | Score: {apt['score']:.3f} | {apt['price']:,.0f} SEK | {apt['rooms']} rooms")
+        for apt in top_5.itertuples(index=False):
+            print(f"  {apt.rank:2d}. {apt.address[:50]:<50} | Score: {apt.score:.3f} | "
+                  f"{apt.price:,.0f} SEK | {apt.rooms} rooms")
 
         print(f"\nResults exported to: {output_path}")
 
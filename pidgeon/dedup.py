@@ -0,0 +1,186 @@
+"""
+Space-efficient URL de-duplication for long crawls.
+
+This module provides a Bloom filter used by the DuplicatesPipeline to
+remember which listing URLs were scraped in earlier runs. Storing a few bits
+per URL instead of the URL keeps the filter at a fixed size on crawls with
+hundreds of thousands of listings, at the cost of a small, tunable
+false-positive rate (a new URL is occasionally reported as already seen).
+
+A filter can be backed by a memory-mapped file, so the set of seen URLs
+survives restarts and a resumed crawl does not re-export earlier listings.
+The mapping is shared, so spiders pointing at the same file, in this
+process or another, de-duplicate against each other.
+"""
+
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from hashlib import blake2b
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional, blake2b is used without it
+    xxhash = None
+
+
+def _blake2b_128(data: bytes) -> int:
+    return int.from_bytes(blake2b(data, digest_size=16).digest(), 'little')
+
+
+# 128-bit key digests by file magic. The magic records which hash a
+# persisted filter was built with, so it is reopened with the same one.
+_DIGESTS: Dict[bytes, Callable[[bytes], int]] = {b'PGBF': _blake2b_128}
+if xxhash is not None:
+    _DIGESTS[b'PGX3'] = xxhash.xxh3_128_intdigest
+    _DEFAULT_MAGIC = b'PGX3'
+else:
+    _DEFAULT_MAGIC = b'PGBF'
+
+_MASK64 = (1 << 64) - 1
+
+# File layout: magic, number of hash functions, number of bits, then the bit array
+_HEADER = struct.Struct('<4sIQ')
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Sized from the expected number of items and the acceptable false-positive
+    rate. Bit positions are derived with double hashing from a single 128-bit
+    digest per key, XXH3 when the xxhash package is installed and blake2b
+    otherwise.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001,
+                 path: Optional[str] = None):
+        """
+        Allocate the filter.
+
+        Args:
+            capacity: Expected number of distinct keys
+            error_rate: Target false-positive rate at full capacity
+            path: Optional file to keep the filter in. An existing file is
+                reopened with the sizing it was created with, a missing one
+                is created from capacity and error_rate.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        num_bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.num_bits = max(8, math.ceil(num_bits))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.path = path
+        self._file = None
+        self._mmap = None
+        self._lock = threading.Lock()
+        self._magic = _DEFAULT_MAGIC
+        self._digest = _DIGESTS[_DEFAULT_MAGIC]
+
+        if path is None:
+            self._bits = bytearray((self.num_bits + 7) // 8)
+        else:
+            self._bits = self._map_file(path)
+
+    def _map_file(self, path: str) -> memoryview:
+        """Create or reopen the backing file and map its bit array."""
+        if not os.path.exists(path):
+            self._create_file(path)
+
+        f = open(path, 'r+b')
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:4] not in (b'PGBF', b'PGX3'):
+            f.close()
+            raise ValueError(f"{path} is not a Bloom filter file")
+        self._magic, self.num_hashes, self.num_bits = _HEADER.unpack(header)
+        if self._magic not in _DIGESTS:
+            f.close()
+            raise ValueError(f"{path} was built with XXH3, install xxhash to open it")
+        self._digest = _DIGESTS[self._magic]
+
+        self._file = f
+        self._mmap = mmap.mmap(f.fileno(), _HEADER.size + (self.num_bits + 7) // 8)
+        return memoryview(self._mmap)[_HEADER.size:]
+
+    def _create_file(self, path: str):
+        """
+        Write an empty filter to path.
+
+        The file is prepared under a temporary name and hard-linked into
+        place, so a concurrent opener never sees a half-written header. If
+        another process got there first its file is kept.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(self._magic, self.num_hashes, self.num_bits))
+                f.truncate(_HEADER.size + (self.num_bits + 7) // 8)
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(tmp_path)
+
+    def _positions(self, key: str):
+        """Yield the bit positions for a key."""
+        digest = self._digest(key.encode('utf-8'))
+        h1 = digest & _MASK64
+        h2 = (digest >> 64) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """
+        Add a key to the filter.
+
+        Returns:
+            True if the key was (probably) already present, False if it is new
+        """
+        positions = list(self._positions(key))
+        with self._lock:
+            # Other processes may map the same file, check-and-set under a file lock
+            locked = self._file is not None and fcntl is not None
+            if locked:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                bits = self._bits
+                present = True
+                for pos in positions:
+                    byte, mask = pos >> 3, 1 << (pos & 7)
+                    if not bits[byte] & mask:
+                        present = False
+                        bits[byte] |= mask
+                return present
+            finally:
+                if locked:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def flush(self):
+        """Write changed bits of a file-backed filter to disk."""
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        """Flush and unmap a file-backed filter. In-memory filters are left as is."""
+        with self._lock:
+            if self._mmap is None:
+                return
+            self._mmap.flush()
+            self._bits.release()
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
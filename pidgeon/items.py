@@ -3,18 +3,24 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 
+import re
+
 import scrapy
 from itemloaders.processors import TakeFirst, MapCompose, Join
 from scrapy.loader import ItemLoader
 
 
+# Compiled once at import, the processors below run for every scraped field
+_PRICE_RE = re.compile(r'[^\d\s,]')
+_INT_RE = re.compile(r'\d+')
+_TRUE_TOKENS = frozenset({'yes', 'ja', 'true', '1', 'finns', 'hiss'})
+
+
 def clean_price(value):
     """Clean price strings by removing non-numeric characters except spaces and commas."""
     if value:
         # Remove currency symbols and other non-numeric characters
-        import re
-        cleaned = re.sub(r'[^\d\s,]', '', str(value))
-        return cleaned.strip()
+        return _PRICE_RE.sub('', str(value)).strip()
     return value
 
 
@@ -28,17 +34,15 @@ def clean_text(value):
 def parse_boolean(value):
     """Parse boolean values from text."""
     if value:
-        value_str = str(value).lower().strip()
-        return value_str in ['yes', 'ja', 'true', '1', 'finns', 'hiss']
+        return str(value).lower().strip() in _TRUE_TOKENS
     return False
 
 
 def parse_integer(value):
     """Parse integer values from text."""
     if value:
-        import re
         # Extract first number found in the string
-        match = re.search(r'\d+', str(value))
+        match = _INT_RE.search(str(value))
         if match:
             return int(match.group())
     return None
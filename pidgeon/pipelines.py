@@ -4,13 +4,31 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 import csv
+import math
 import os
+import queue
+import threading
+import time
+from collections import Counter
 from datetime import datetime
-from typing import Dict, Any
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
 from scrapy import Item
 from scrapy.exceptions import DropItem
+from pidgeon.dedup import BloomFilter
 from pidgeon.items import ApartmentItem
 
+# Thousands separators stripped from scraped prices and fees, including the
+# non-breaking space used on Swedish listing pages
+_NUM_STRIP = str.maketrans('', '', ' ,\u00a0')
+
+
+def _to_int(value) -> int:
+    """Parse a scraped numeric field such as '3 250 000' into an int."""
+    if type(value) is int:
+        return value
+    return int(str(value).translate(_NUM_STRIP))
+
 
 class ValidationPipeline:
     """
@@ -19,6 +37,7 @@ class ValidationPipeline:
     """
 
     required_fields = ['url', 'source', 'address']
+    url_schemes = frozenset({'http', 'https'})
 
     def process_item(self, item: Item, spider) -> Item:
         """Validate item fields and drop invalid items."""
@@ -28,33 +47,52 @@ class ValidationPipeline:
             if not item.get(field):
                 raise DropItem(f"Missing required field: {field} in {item}")
 
-        # Validate price is numeric if present
-        if item.get('price'):
-            try:
-                price = int(str(item['price']).replace(' ', '').replace(',', ''))
-                if price <= 0:
-                    raise DropItem(f"Invalid price: {item['price']} in {item}")
-            except (ValueError, TypeError):
-                spider.logger.warning(f"Invalid price format: {item['price']} in {item}")
-                # Don't drop item, just log warning
+        # Check the URL is an absolute web address
+        try:
+            parts = urlsplit(item['url'])
+        except (ValueError, TypeError, AttributeError):
+            parts = None
+        if parts is None or parts.scheme not in self.url_schemes or not parts.netloc:
+            raise DropItem(f"Invalid URL: {item['url']} in {item}")
+
+        # Validate price is numeric if present. The item loaders already emit
+        # ints, other sources may send scraped strings such as '3 250 000',
+        # which are parsed and stored back for later pipelines
+        price = item.get('price')
+        if price:
+            if type(price) is not int and type(price) is not float:
+                try:
+                    price = _to_int(price)
+                except (ValueError, TypeError):
+                    raise DropItem(f"Invalid price format: {item['price']} in {item}")
+                item['price'] = price
+            if not price > 0:
+                raise DropItem(f"Invalid price: {item['price']} in {item}")
 
         # Validate fee is numeric if present
-        if item.get('fee'):
-            try:
-                fee = int(str(item['fee']).replace(' ', '').replace(',', ''))
-                if fee < 0:
-                    raise DropItem(f"Invalid fee: {item['fee']} in {item}")
-            except (ValueError, TypeError):
-                spider.logger.warning(f"Invalid fee format: {item['fee']} in {item}")
+        fee = item.get('fee')
+        if fee:
+            if type(fee) is not int:
+                try:
+                    fee = _to_int(fee)
+                    item['fee'] = fee
+                except (ValueError, TypeError):
+                    spider.logger.warning(f"Invalid fee format: {item['fee']} in {item}")
+                    # Don't drop item, just log warning
+                    fee = 0
+            if fee < 0:
+                raise DropItem(f"Invalid fee: {item['fee']} in {item}")
 
         # Validate rooms if present
-        if item.get('rooms'):
-            try:
-                rooms = float(item['rooms'])
-                if rooms <= 0 or rooms > 20:  # Reasonable limits
-                    spider.logger.warning(f"Unusual room count: {item['rooms']} in {item}")
-            except (ValueError, TypeError):
-                spider.logger.warning(f"Invalid room format: {item['rooms']} in {item}")
+        rooms = item.get('rooms')
+        if rooms:
+            if type(rooms) is not int and type(rooms) is not float:
+                try:
+                    rooms = float(rooms)
+                except (ValueError, TypeError):
+                    raise DropItem(f"Invalid room format: {item['rooms']} in {item}")
+            if not 0 < rooms <= 20:  # Reasonable limits
+                spider.logger.warning(f"Unusual room count: {item['rooms']} in {item}")
 
         # Validate year built if present
         if item.get('year_built'):
@@ -73,29 +111,84 @@ class DuplicatesPipeline:
     """
     Pipeline to filter out duplicate apartment listings.
     Uses URL as the unique identifier.
+
+    Within a run, seen URLs are kept in an exact set, so a new listing is
+    never dropped as a false duplicate. Memory grows with every URL seen.
+
+    Set DEDUP_BLOOM_PATH to keep the seen URLs in a file between runs instead,
+    so a restarted crawl skips listings that were already exported. They are
+    then tracked in a Bloom filter, which keeps memory constant. Spiders using
+    the same path share the filter, also when they run as separate processes.
+    With the default sizing about 0.1% of new listings may be dropped as false
+    duplicates once a million URLs have been seen.
     """
 
-    def __init__(self):
-        self.seen_urls = set()
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001,
+                 path: Optional[str] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+        # Persisted Bloom filter, mapped in open_spider
+        self.seen_urls = None
+        # URLs seen in this run, used when nothing is persisted
+        self.urls = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            capacity=settings.getint('DEDUP_CAPACITY', 1_000_000),
+            error_rate=settings.getfloat('DEDUP_ERROR_RATE', 0.001),
+            path=settings.get('DEDUP_BLOOM_PATH'),
+        )
+
+    def open_spider(self, spider):
+        """Map the persisted filter, creating it on the first run."""
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.seen_urls = BloomFilter(capacity=self.capacity,
+                                         error_rate=self.error_rate, path=self.path)
+            spider.logger.info(f"Loaded URL de-duplication filter from {self.path}")
+
+    def close_spider(self, spider):
+        """Flush the persisted filter to disk."""
+        if self.path and self.seen_urls is not None:
+            self.seen_urls.close()
+            self.seen_urls = None
 
     def process_item(self, item: Item, spider) -> Item:
         """Filter out duplicate items based on URL."""
         url = item.get('url')
+        if not url:
+            # Nothing to de-duplicate on, ValidationPipeline handles missing URLs
+            return item
 
-        if url in self.seen_urls:
-            raise DropItem(f"Duplicate item found: {url}")
-        else:
-            self.seen_urls.add(url)
+        if self.seen_urls is not None:
+            if self.seen_urls.add(url):
+                raise DropItem(f"Duplicate item found: {url}")
             return item
 
+        if url in self.urls:
+            raise DropItem(f"Duplicate item found: {url}")
+        self.urls.add(url)
+        return item
+
 
 class DataEnrichmentPipeline:
     """
     Pipeline to enrich apartment data with calculated fields.
     """
 
+    # Spiders whose item loaders already emit bool flags and a scraped_at
+    # timestamp, their items need no normalization here
+    NORMALIZED_SPIDERS = frozenset({'booli', 'hemnet'})
+
     def process_item(self, item: Item, spider) -> Item:
         """Enrich item with calculated fields."""
+        if spider.name in self.NORMALIZED_SPIDERS:
+            return item
 
         # Calculate price per m2 if not already present
         if not item.get('price_per_m2') and item.get('price'):
@@ -115,65 +208,159 @@ class DataEnrichmentPipeline:
         return item
 
 
+def _make_row_encoder(fieldnames):
+    """
+    Build a function that turns an item into a CSV row in fieldnames order.
+
+    The function is generated with the columns inlined, so encoding an item
+    is a straight run of lookups instead of a generic loop over its fields.
+    None becomes '', booleans become 'Yes'/'No' and anything else is str()'d.
+    """
+    lines = ['def encode(item):', '    get = item.get',
+             '    row = []', '    append = row.append']
+    for name in fieldnames:
+        lines.append(f'    v = get({name!r})')
+        lines.append("    append('' if v is None else 'Yes' if v is True"
+                     " else 'No' if v is False else str(v))")
+    lines.append('    return row')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['encode']
+
+
 class CSVExportPipeline:
     """
     Pipeline to export apartment data to CSV files.
     Creates separate files for each spider run.
+
+    process_item only encodes the row and puts it on a per-spider queue. A
+    writer thread owns the file, writes rows in batches of up to BATCH_SIZE
+    and flushes at least every FLUSH_INTERVAL seconds, so at most that much
+    output is lost if the crawl dies. The queue is bounded by QUEUE_SIZE,
+    which makes the crawl wait for the disk instead of growing without limit.
+    A batch that cannot be written is logged and skipped, and text that
+    cannot be encoded, such as a lone surrogate from a JSON-LD escape, is
+    written as '?'. If the writer thread stops anyway, process_item raises
+    instead of blocking the crawl on a queue nobody drains.
     """
 
+    # CSV columns, the common ApartmentItem fields in declaration order
+    FIELDS = tuple(ApartmentItem.fields)
+
+    BATCH_SIZE = 1024
+    FLUSH_INTERVAL = 5.0
+    QUEUE_SIZE = 10_000
+    # Seconds process_item waits on a full queue before checking the writer is alive
+    PUT_TIMEOUT = 1.0
+
     def __init__(self):
         self.files = {}
         self.writers = {}
+        self.encoders = {}
+        self.queues = {}
+        self.writer_threads = {}
         self.output_dir = 'output'
 
+    def open_spider(self, spider):
+        """Initialize CSV file for the spider."""
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def open_spider(self, spider):
-        """Initialize CSV file for the spider."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{self.output_dir}/apartments_{spider.name}_{timestamp}.csv"
 
-        self.files[spider] = open(filename, 'w', newline='', encoding='utf-8')
-
-        # Define CSV columns based on ApartmentItem fields
-        fieldnames = [
-            'url', 'source', 'address', 'price', 'fee', 'price_per_m2',
-            'rooms', 'year_built', 'housing_cooperative', 'has_elevator',
-            'has_balcony', 'floor', 'total_floors', 'scraped_at'
-        ]
-
-        self.writers[spider] = csv.DictWriter(
-            self.files[spider],
-            fieldnames=fieldnames,
-            extrasaction='ignore'
+        self.files[spider] = open(filename, 'w', newline='', encoding='utf-8',
+                                  errors='replace', buffering=1 << 20)
+        if hasattr(os, 'posix_fadvise'):
+            # Append-only file, let the kernel write it back sequentially
+            os.posix_fadvise(self.files[spider].fileno(), 0, 0,
+                             os.POSIX_FADV_SEQUENTIAL)
+
+        self.writers[spider] = csv.writer(self.files[spider])
+        self.writers[spider].writerow(self.FIELDS)
+        self.encoders[spider] = _make_row_encoder(self.FIELDS)
+
+        self.queues[spider] = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.writer_threads[spider] = threading.Thread(
+            target=self._drain,
+            args=(spider,),
+            name=f'csv-writer-{spider.name}',
+            daemon=True
         )
-        self.writers[spider].writeheader()
+        self.writer_threads[spider].start()
 
         spider.logger.info(f"CSV export pipeline initialized: {filename}")
 
     def close_spider(self, spider):
         """Close CSV file when spider finishes."""
         if spider in self.files:
+            # Let the writer thread drain the queue, then close the file
+            if self.writer_threads[spider].is_alive():
+                self.queues[spider].put(None)
+                self.writer_threads[spider].join()
             self.files[spider].close()
             del self.files[spider]
             del self.writers[spider]
+            del self.encoders[spider]
+            del self.queues[spider]
+            del self.writer_threads[spider]
+
+    def _drain(self, spider):
+        """Writer thread: write queued rows in batches until the None sentinel."""
+        rows_queue = self.queues[spider]
+        writer = self.writers[spider]
+        f = self.files[spider]
+        last_flush = time.monotonic()
+        done = False
+
+        while not done:
+            try:
+                row = rows_queue.get(timeout=self.FLUSH_INTERVAL)
+            except queue.Empty:
+                try:
+                    f.flush()
+                except OSError as e:
+                    spider.logger.error(f"Could not flush CSV file: {e}")
+                last_flush = time.monotonic()
+                continue
+
+            # Take whatever else is already queued, up to one batch
+            batch = []
+            while row is not None:
+                batch.append(row)
+                if len(batch) >= self.BATCH_SIZE:
+                    break
+                try:
+                    row = rows_queue.get_nowait()
+                except queue.Empty:
+                    break
+            done = row is None
+
+            try:
+                writer.writerows(batch)
+                if time.monotonic() - last_flush >= self.FLUSH_INTERVAL:
+                    f.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                # Keep consuming so process_item never blocks on a full queue
+                spider.logger.error(f"Could not write {len(batch)} rows to CSV: {e!r}")
 
     def process_item(self, item: Item, spider) -> Item:
         """Write item to CSV file."""
         if spider in self.writers:
-            # Convert item to dict and handle None values
-            item_dict = {}
-            for key, value in item.items():
-                if value is None:
-                    item_dict[key] = ''
-                elif isinstance(value, bool):
-                    item_dict[key] = 'Yes' if value else 'No'
-                else:
-                    item_dict[key] = str(value)
-
-            self.writers[spider].writerow(item_dict)
-            self.files[spider].flush()  # Ensure data is written immediately
+            row = self.encoders[spider](item)
+            rows_queue = self.queues[spider]
+            writer_thread = self.writer_threads[spider]
+            while True:
+                if not writer_thread.is_alive():
+                    raise RuntimeError(
+                        f"CSV writer thread for {spider.name} has stopped")
+                try:
+                    rows_queue.put(row, timeout=self.PUT_TIMEOUT)
+                    break
+                except queue.Full:
+                    # The disk is slow, retry once the writer is known to be alive
+                    continue
 
         return item
 
@@ -184,59 +371,71 @@ class StatisticsPipeline:
     """
 
     def __init__(self):
-        self.stats = {
-            'total_items': 0,
-            'items_by_source': {},
-            'price_stats': {'min': float('inf'), 'max': 0, 'total': 0, 'count': 0},
-            'rooms_distribution': {},
+        self.total_items = 0
+        self.items_by_source = Counter()
+        self.rooms_distribution = Counter()
+        self.price_min = math.inf
+        self.price_max = 0
+        self.price_total = 0
+        self.price_count = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the collected statistics."""
+        return {
+            'total_items': self.total_items,
+            'items_by_source': dict(self.items_by_source),
+            'price_stats': {'min': self.price_min, 'max': self.price_max,
+                            'total': self.price_total, 'count': self.price_count},
+            'rooms_distribution': dict(self.rooms_distribution),
         }
 
     def process_item(self, item: Item, spider) -> Item:
         """Collect statistics from item."""
-        self.stats['total_items'] += 1
+        get = item.get
+        self.total_items += 1
 
         # Count by source
-        source = item.get('source', 'unknown')
-        self.stats['items_by_source'][source] = self.stats['items_by_source'].get(source, 0) + 1
+        self.items_by_source[get('source', 'unknown')] += 1
 
         # Price statistics
-        if item.get('price'):
+        price = get('price')
+        if price:
             try:
-                price = int(str(item['price']).replace(' ', '').replace(',', ''))
-                self.stats['price_stats']['min'] = min(self.stats['price_stats']['min'], price)
-                self.stats['price_stats']['max'] = max(self.stats['price_stats']['max'], price)
-                self.stats['price_stats']['total'] += price
-                self.stats['price_stats']['count'] += 1
+                price = _to_int(price)
             except (ValueError, TypeError):
                 pass
+            else:
+                if price < self.price_min:
+                    self.price_min = price
+                if price > self.price_max:
+                    self.price_max = price
+                self.price_total += price
+                self.price_count += 1
 
         # Rooms distribution
-        if item.get('rooms'):
-            try:
-                rooms = str(item['rooms'])
-                self.stats['rooms_distribution'][rooms] = self.stats['rooms_distribution'].get(rooms, 0) + 1
-            except (ValueError, TypeError):
-                pass
+        rooms = get('rooms')
+        if rooms:
+            self.rooms_distribution[str(rooms)] += 1
 
         return item
 
     def close_spider(self, spider):
         """Log statistics when spider finishes."""
         spider.logger.info("=== SCRAPING STATISTICS ===")
-        spider.logger.info(f"Total items scraped: {self.stats['total_items']}")
+        spider.logger.info(f"Total items scraped: {self.total_items}")
 
-        for source, count in self.stats['items_by_source'].items():
+        for source, count in self.items_by_source.items():
             spider.logger.info(f"Items from {source}: {count}")
 
-        if self.stats['price_stats']['count'] > 0:
-            avg_price = self.stats['price_stats']['total'] / self.stats['price_stats']['count']
-            spider.logger.info(f"Price range: {self.stats['price_stats']['min']:,} - {self.stats['price_stats']['max']:,}")
+        if self.price_count > 0:
+            avg_price = self.price_total / self.price_count
+            spider.logger.info(f"Price range: {self.price_min:,} - {self.price_max:,}")
             spider.logger.info(f"Average price: {avg_price:,.0f}")
 
-        if self.stats['rooms_distribution']:
+        if self.rooms_distribution:
             spider.logger.info("Rooms distribution:")
-            for rooms, count in sorted(self.stats['rooms_distribution'].items()):
+            for rooms, count in sorted(self.rooms_distribution.items()):
                 spider.logger.info(f"  {rooms} rooms: {count} apartments")
 
         spider.logger.info("===========================")
-
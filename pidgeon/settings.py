@@ -62,6 +62,13 @@ ITEM_PIPELINES = {
     'pidgeon.pipelines.CSVExportPipeline': 800,
 }
 
+# Keep seen URLs in a Bloom filter on disk so a restarted crawl skips
+# listings that were already scraped (an exact in-memory set by default).
+# Capacity and error rate size the filter when its file is first created.
+#DEDUP_BLOOM_PATH = 'output/seen_urls.bloom'
+#DEDUP_CAPACITY = 1000000
+#DEDUP_ERROR_RATE = 0.001
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 AUTOTHROTTLE_ENABLED = True
@@ -8,10 +8,27 @@ This spider handles:
 4. Extracting apartment data according to defined KPIs
 """
 
+import asyncio
+import json
+import re
 import scrapy
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from urllib.parse import urljoin, urlparse, parse_qs
+from urllib.parse import urljoin, urlparse, urlsplit, parse_qs
 from pidgeon.items import ApartmentItemLoader, BooliApartmentItem
+from pidgeon.utils import detect_features, first_css, page_texts
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - optional dependency
+    _json_loads = json.loads
+
+# JSON-LD keys read by _extract_structured_data, blobs without any are skipped
+_JSON_LD_KEYS = ('"name"', '"offers"', '"numberOfRooms"')
+
+# Listing ID at the end of a detail page URL path
+_ID_RE = re.compile(r'-(\d+)/*$')
 
 
 class BooliSpider(scrapy.Spider):
@@ -30,10 +47,79 @@ class BooliSpider(scrapy.Spider):
         'CONCURRENT_REQUESTS_PER_DOMAIN': 1,
     }
 
+    # Threads used to extract fields from detail pages off the reactor thread
+    PARSE_WORKERS = 4
+
+    # Field selectors of the known layouts, most specific first. They are
+    # tried in order rather than as one CSS union: generic classes such as
+    # .price also occur elsewhere on a page, and a union would return
+    # whichever match comes first in the document.
+    ADDRESS_SEL = (
+        'h1.property-title::text',
+        '.property-header h1::text',
+        '[data-testid="property-address"]::text',
+        '.address h1::text',
+        '.listing-address::text',
+    )
+    PRICE_SEL = (
+        '.property-price .price::text',
+        '[data-testid="property-price"]::text',
+        '.sold-price::text',
+        '.listing-price::text',
+        '.final-price::text',
+    )
+    FEE_SEL = (
+        '.property-fee::text',
+        '[data-testid="monthly-fee"]::text',
+        '.monthly-fee::text',
+        '.avgift::text',
+    )
+    PRICE_PER_M2_SEL = (
+        '.price-per-m2::text',
+        '[data-testid="price-per-square-meter"]::text',
+        '.square-meter-price::text',
+    )
+    ROOMS_SEL = (
+        '.property-rooms::text',
+        '[data-testid="rooms"]::text',
+        '.rooms::text',
+        '.antal-rum::text',
+    )
+    YEAR_BUILT_SEL = (
+        '.construction-year::text',
+        '[data-testid="construction-year"]::text',
+        '.year-built::text',
+        '.byggår::text',
+    )
+    COOP_SEL = (
+        '.housing-association::text',
+        '[data-testid="housing-cooperative"]::text',
+        '.cooperative::text',
+        '.förening::text',
+    )
+    FLOOR_SEL = (
+        '.floor-info::text',
+        '[data-testid="floor"]::text',
+        '.våning::text',
+        '.floor::text',
+    )
+    STATUS_SEL = (
+        '.listing-status::text',
+        '[data-testid="listing-status"]::text',
+        '.status::text',
+    )
+
     def __init__(self, search_url=None, *args, **kwargs):
         super(BooliSpider, self).__init__(*args, **kwargs)
         if search_url:
             self.start_urls = [search_url]
+        self._parse_pool = ThreadPoolExecutor(
+            max_workers=self.PARSE_WORKERS,
+            thread_name_prefix=f'{self.name}-parse'
+        )
+
+    def closed(self, reason):
+        self._parse_pool.shutdown(wait=False)
 
     def parse(self, response):
         """
@@ -75,12 +161,23 @@ class BooliSpider(scrapy.Spider):
                     meta={'search_url': response.url}
                 )
 
-    def parse_apartment(self, response):
+    async def parse_apartment(self, response):
         """
         Parse individual apartment detail pages and extract all KPI data.
+
+        The selector work runs on the parse thread pool so the reactor keeps
+        serving downloads meanwhile, the item itself is built back on the
+        reactor thread.
         """
         self.logger.info(f'Parsing apartment from {response.url}')
 
+        loop = asyncio.get_running_loop()
+        loader = await loop.run_in_executor(
+            self._parse_pool, self._populate_loader, response)
+        yield loader.load_item()
+
+    def _populate_loader(self, response):
+        """Fill an item loader with the KPI fields found on a detail page."""
         loader = ApartmentItemLoader(item=BooliApartmentItem(), response=response)
 
         # Basic identification
@@ -94,156 +191,71 @@ class BooliSpider(scrapy.Spider):
             loader.add_value('booli_id', booli_id)
 
         # Address - try multiple selectors
-        address_selectors = [
-            'h1.property-title::text',
-            '.property-header h1::text',
-            '[data-testid="property-address"]::text',
-            '.address h1::text',
-            '.listing-address::text'
-        ]
-        for selector in address_selectors:
-            address = response.css(selector).get()
-            if address:
-                loader.add_value('address', address.strip())
-                break
+        address = first_css(response, self.ADDRESS_SEL)
+        if address:
+            loader.add_value('address', address.strip())
 
         # Price - try multiple selectors
-        price_selectors = [
-            '.property-price .price::text',
-            '[data-testid="property-price"]::text',
-            '.sold-price::text',
-            '.listing-price::text',
-            '.final-price::text'
-        ]
-        for selector in price_selectors:
-            price = response.css(selector).get()
-            if price:
-                loader.add_value('price', price)
-                break
+        price = first_css(response, self.PRICE_SEL)
+        if price:
+            loader.add_value('price', price)
 
         # Fee (monthly fee) - try multiple selectors
-        fee_selectors = [
-            '.property-fee::text',
-            '[data-testid="monthly-fee"]::text',
-            '.monthly-fee::text',
-            '.avgift::text'
-        ]
-        for selector in fee_selectors:
-            fee = response.css(selector).get()
-            if fee:
-                loader.add_value('fee', fee)
-                break
+        fee = first_css(response, self.FEE_SEL)
+        if fee:
+            loader.add_value('fee', fee)
 
         # Price per m2
-        price_per_m2_selectors = [
-            '.price-per-m2::text',
-            '[data-testid="price-per-square-meter"]::text',
-            '.square-meter-price::text'
-        ]
-        for selector in price_per_m2_selectors:
-            price_per_m2 = response.css(selector).get()
-            if price_per_m2:
-                loader.add_value('price_per_m2', price_per_m2)
-                break
+        price_per_m2 = first_css(response, self.PRICE_PER_M2_SEL)
+        if price_per_m2:
+            loader.add_value('price_per_m2', price_per_m2)
 
         # Rooms
-        rooms_selectors = [
-            '.property-rooms::text',
-            '[data-testid="rooms"]::text',
-            '.rooms::text',
-            '.antal-rum::text'
-        ]
-        for selector in rooms_selectors:
-            rooms = response.css(selector).get()
-            if rooms:
-                loader.add_value('rooms', rooms)
-                break
+        rooms = first_css(response, self.ROOMS_SEL)
+        if rooms:
+            loader.add_value('rooms', rooms)
 
         # Year built
-        year_built_selectors = [
-            '.construction-year::text',
-            '[data-testid="construction-year"]::text',
-            '.year-built::text',
-            '.byggår::text'
-        ]
-        for selector in year_built_selectors:
-            year_built = response.css(selector).get()
-            if year_built:
-                loader.add_value('year_built', year_built)
-                break
+        year_built = first_css(response, self.YEAR_BUILT_SEL)
+        if year_built:
+            loader.add_value('year_built', year_built)
 
         # Housing cooperative
-        coop_selectors = [
-            '.housing-association::text',
-            '[data-testid="housing-cooperative"]::text',
-            '.cooperative::text',
-            '.förening::text'
-        ]
-        for selector in coop_selectors:
-            coop = response.css(selector).get()
-            if coop:
-                loader.add_value('housing_cooperative', coop)
-                break
-
-        # Elevator - look for text indicating elevator presence
-        elevator_text = ' '.join(response.css('*::text').getall()).lower()
-        has_elevator = any(keyword in elevator_text for keyword in
-                          ['hiss', 'elevator', 'lift'])
-        loader.add_value('has_elevator', has_elevator)
+        coop = first_css(response, self.COOP_SEL)
+        if coop:
+            loader.add_value('housing_cooperative', coop)
 
-        # Balcony/Patio - look for text indicating balcony/patio presence
-        balcony_text = ' '.join(response.css('*::text').getall()).lower()
-        has_balcony = any(keyword in balcony_text for keyword in
-                         ['balkong', 'balcony', 'terrass', 'terrace', 'uteplats', 'patio'])
+        # Elevator and balcony/patio - look for indicating keywords in the page text
+        has_elevator, has_balcony = detect_features(page_texts(response))
+        loader.add_value('has_elevator', has_elevator)
         loader.add_value('has_balcony', has_balcony)
 
         # Floor and total floors
-        floor_selectors = [
-            '.floor-info::text',
-            '[data-testid="floor"]::text',
-            '.våning::text',
-            '.floor::text'
-        ]
-        for selector in floor_selectors:
-            floor_info = response.css(selector).get()
-            if floor_info:
-                # Extract floor number and total floors from text like "3 av 5" or "3/5"
-                floor_parts = floor_info.strip().replace('/', ' av ').split()
-                if len(floor_parts) >= 1:
-                    loader.add_value('floor', floor_parts[0])
-                if len(floor_parts) >= 3:
-                    loader.add_value('total_floors', floor_parts[2])
-                break
+        floor_info = first_css(response, self.FLOOR_SEL)
+        if floor_info:
+            # Extract floor number and total floors from text like "3 av 5" or "3/5"
+            floor_parts = floor_info.strip().replace('/', ' av ').split()
+            if len(floor_parts) >= 1:
+                loader.add_value('floor', floor_parts[0])
+            if len(floor_parts) >= 3:
+                loader.add_value('total_floors', floor_parts[2])
 
         # Listing status (specific to Booli)
-        status_selectors = [
-            '.listing-status::text',
-            '[data-testid="listing-status"]::text',
-            '.status::text'
-        ]
-        for selector in status_selectors:
-            status = response.css(selector).get()
-            if status:
-                loader.add_value('listing_status', status)
-                break
+        status = first_css(response, self.STATUS_SEL)
+        if status:
+            loader.add_value('listing_status', status)
 
         # Extract additional metadata from structured data if available
         self._extract_structured_data(response, loader)
 
-        yield loader.load_item()
+        return loader
 
     def _extract_booli_id(self, url):
         """Extract Booli ID from URL."""
-        try:
-            # Booli URLs typically look like: https://www.booli.se/bostad/lagenhet-stockholm-1234567
-            # The ID is usually at the end
-            parts = url.rstrip('/').split('-')
-            for part in reversed(parts):
-                if part.isdigit():
-                    return part
-        except Exception as e:
-            self.logger.warning(f'Could not extract Booli ID from URL {url}: {e}')
-        return None
+        # Booli URLs typically look like: https://www.booli.se/bostad/lagenhet-stockholm-1234567
+        # The ID is the trailing run of digits in the path, not the query string
+        m = _ID_RE.search(urlsplit(url).path)
+        return m.group(1) if m else None
 
     def _extract_structured_data(self, response, loader):
         """
@@ -253,19 +265,29 @@ class BooliSpider(scrapy.Spider):
         try:
             # Look for JSON-LD structured data
             json_ld_scripts = response.css('script[type="application/ld+json"]::text').getall()
+            if not json_ld_scripts:
+                return
+
+            def missing(field):
+                # Collected values are already input-processed, so this is what
+                # TakeFirst would return without running the output processor
+                return not any(v is not None and v != ''
+                               for v in loader.get_collected_values(field))
 
             for script in json_ld_scripts:
-                import json
+                # Only parse blobs that can carry the fields used below
+                if not any(key in script for key in _JSON_LD_KEYS):
+                    continue
                 try:
-                    data = json.loads(script)
+                    data = _json_loads(script)
                     if isinstance(data, dict):
                         # Extract relevant fields if they exist
-                        if 'name' in data and not loader.get_output_value('address'):
+                        if 'name' in data and missing('address'):
                             loader.add_value('address', data['name'])
 
                         if 'offers' in data and isinstance(data['offers'], dict):
                             offers = data['offers']
-                            if 'price' in offers and not loader.get_output_value('price'):
+                            if 'price' in offers and missing('price'):
                                 loader.add_value('price', offers['price'])
 
                         # Look for property-specific data
@@ -273,7 +295,7 @@ class BooliSpider(scrapy.Spider):
                             if 'floorSize' in data:
                                 # Could be used to calculate price per m2 if not available
                                 pass
-                            if 'numberOfRooms' in data and not loader.get_output_value('rooms'):
+                            if 'numberOfRooms' in data and missing('rooms'):
                                 loader.add_value('rooms', data['numberOfRooms'])
 
                 except json.JSONDecodeError:
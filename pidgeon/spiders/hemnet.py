@@ -8,10 +8,17 @@ This spider handles:
 4. Extracting apartment data according to defined KPIs
 """
 
+import asyncio
+import re
 import scrapy
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from urllib.parse import urljoin, urlparse, parse_qs
+from urllib.parse import urljoin, urlparse, urlsplit, parse_qs
 from pidgeon.items import ApartmentItemLoader, HemnetApartmentItem
+from pidgeon.utils import detect_features, first_css, page_texts
+
+# Listing ID at the end of a detail page URL path
+_ID_RE = re.compile(r'-(\d+)/*$')
 
 
 class HemnetSpider(scrapy.Spider):
@@ -30,10 +37,74 @@ class HemnetSpider(scrapy.Spider):
         'CONCURRENT_REQUESTS_PER_DOMAIN': 1,
     }
 
+    # Threads used to extract fields from detail pages off the reactor thread
+    PARSE_WORKERS = 4
+
+    # Field selectors of the known layouts, most specific first. They are
+    # tried in order rather than as one CSS union: generic classes such as
+    # .price also occur elsewhere on a page, and a union would return
+    # whichever match comes first in the document.
+    ADDRESS_SEL = (
+        'h1.property-address::text',
+        '.property-header h1::text',
+        '[data-testid="property-address"]::text',
+        '.address::text',
+    )
+    PRICE_SEL = (
+        '.property-info__price::text',
+        '[data-testid="property-price"]::text',
+        '.price::text',
+        '.property-price::text',
+    )
+    FEE_SEL = (
+        '.property-info__fee::text',
+        '[data-testid="property-fee"]::text',
+        '.fee::text',
+        '.monthly-fee::text',
+    )
+    PRICE_PER_M2_SEL = (
+        '.property-info__price-per-m2::text',
+        '[data-testid="price-per-square-meter"]::text',
+        '.price-per-m2::text',
+    )
+    ROOMS_SEL = (
+        '.property-info__rooms::text',
+        '[data-testid="property-rooms"]::text',
+        '.rooms::text',
+    )
+    YEAR_BUILT_SEL = (
+        '.property-info__year-built::text',
+        '[data-testid="construction-year"]::text',
+        '.year-built::text',
+    )
+    COOP_SEL = (
+        '.property-info__association::text',
+        '[data-testid="housing-cooperative"]::text',
+        '.housing-cooperative::text',
+        '.association::text',
+    )
+    FLOOR_SEL = (
+        '.property-info__floor::text',
+        '[data-testid="floor"]::text',
+        '.floor::text',
+    )
+    LISTING_TYPE_SEL = (
+        '.property-info__type::text',
+        '[data-testid="property-type"]::text',
+        '.property-type::text',
+    )
+
     def __init__(self, search_url=None, *args, **kwargs):
         super(HemnetSpider, self).__init__(*args, **kwargs)
         if search_url:
             self.start_urls = [search_url]
+        self._parse_pool = ThreadPoolExecutor(
+            max_workers=self.PARSE_WORKERS,
+            thread_name_prefix=f'{self.name}-parse'
+        )
+
+    def closed(self, reason):
+        self._parse_pool.shutdown(wait=False)
 
     def parse(self, response):
         """
@@ -75,12 +146,23 @@ class HemnetSpider(scrapy.Spider):
                     meta={'search_url': response.url}
                 )
 
-    def parse_apartment(self, response):
+    async def parse_apartment(self, response):
         """
         Parse individual apartment detail pages and extract all KPI data.
+
+        The selector work runs on the parse thread pool so the reactor keeps
+        serving downloads meanwhile, the item itself is built back on the
+        reactor thread.
         """
         self.logger.info(f'Parsing apartment from {response.url}')
 
+        loop = asyncio.get_running_loop()
+        loader = await loop.run_in_executor(
+            self._parse_pool, self._populate_loader, response)
+        yield loader.load_item()
+
+    def _populate_loader(self, response):
+        """Fill an item loader with the KPI fields found on a detail page."""
         loader = ApartmentItemLoader(item=HemnetApartmentItem(), response=response)
 
         # Basic identification
@@ -94,146 +176,66 @@ class HemnetSpider(scrapy.Spider):
             loader.add_value('hemnet_id', hemnet_id)
 
         # Address - try multiple selectors
-        address_selectors = [
-            'h1.property-address::text',
-            '.property-header h1::text',
-            '[data-testid="property-address"]::text',
-            '.address::text'
-        ]
-        for selector in address_selectors:
-            address = response.css(selector).get()
-            if address:
-                loader.add_value('address', address.strip())
-                break
+        address = first_css(response, self.ADDRESS_SEL)
+        if address:
+            loader.add_value('address', address.strip())
 
         # Price - try multiple selectors
-        price_selectors = [
-            '.property-info__price::text',
-            '[data-testid="property-price"]::text',
-            '.price::text',
-            '.property-price::text'
-        ]
-        for selector in price_selectors:
-            price = response.css(selector).get()
-            if price:
-                loader.add_value('price', price)
-                break
+        price = first_css(response, self.PRICE_SEL)
+        if price:
+            loader.add_value('price', price)
 
         # Fee (monthly fee) - try multiple selectors
-        fee_selectors = [
-            '.property-info__fee::text',
-            '[data-testid="property-fee"]::text',
-            '.fee::text',
-            '.monthly-fee::text'
-        ]
-        for selector in fee_selectors:
-            fee = response.css(selector).get()
-            if fee:
-                loader.add_value('fee', fee)
-                break
+        fee = first_css(response, self.FEE_SEL)
+        if fee:
+            loader.add_value('fee', fee)
 
         # Price per m2
-        price_per_m2_selectors = [
-            '.property-info__price-per-m2::text',
-            '[data-testid="price-per-square-meter"]::text',
-            '.price-per-m2::text'
-        ]
-        for selector in price_per_m2_selectors:
-            price_per_m2 = response.css(selector).get()
-            if price_per_m2:
-                loader.add_value('price_per_m2', price_per_m2)
-                break
+        price_per_m2 = first_css(response, self.PRICE_PER_M2_SEL)
+        if price_per_m2:
+            loader.add_value('price_per_m2', price_per_m2)
 
         # Rooms
-        rooms_selectors = [
-            '.property-info__rooms::text',
-            '[data-testid="property-rooms"]::text',
-            '.rooms::text'
-        ]
-        for selector in rooms_selectors:
-            rooms = response.css(selector).get()
-            if rooms:
-                loader.add_value('rooms', rooms)
-                break
+        rooms = first_css(response, self.ROOMS_SEL)
+        if rooms:
+            loader.add_value('rooms', rooms)
 
         # Year built
-        year_built_selectors = [
-            '.property-info__year-built::text',
-            '[data-testid="construction-year"]::text',
-            '.year-built::text'
-        ]
-        for selector in year_built_selectors:
-            year_built = response.css(selector).get()
-            if year_built:
-                loader.add_value('year_built', year_built)
-                break
+        year_built = first_css(response, self.YEAR_BUILT_SEL)
+        if year_built:
+            loader.add_value('year_built', year_built)
 
         # Housing cooperative
-        coop_selectors = [
-            '.property-info__association::text',
-            '[data-testid="housing-cooperative"]::text',
-            '.housing-cooperative::text',
-            '.association::text'
-        ]
-        for selector in coop_selectors:
-            coop = response.css(selector).get()
-            if coop:
-                loader.add_value('housing_cooperative', coop)
-                break
-
-        # Elevator - look for text indicating elevator presence
-        elevator_text = ' '.join(response.css('*::text').getall()).lower()
-        has_elevator = any(keyword in elevator_text for keyword in
-                          ['hiss', 'elevator', 'lift'])
-        loader.add_value('has_elevator', has_elevator)
+        coop = first_css(response, self.COOP_SEL)
+        if coop:
+            loader.add_value('housing_cooperative', coop)
 
-        # Balcony/Patio - look for text indicating balcony/patio presence
-        balcony_text = ' '.join(response.css('*::text').getall()).lower()
-        has_balcony = any(keyword in balcony_text for keyword in
-                         ['balkong', 'balcony', 'terrass', 'terrace', 'uteplats', 'patio'])
+        # Elevator and balcony/patio - look for indicating keywords in the page text
+        has_elevator, has_balcony = detect_features(page_texts(response))
+        loader.add_value('has_elevator', has_elevator)
         loader.add_value('has_balcony', has_balcony)
 
         # Floor and total floors
-        floor_selectors = [
-            '.property-info__floor::text',
-            '[data-testid="floor"]::text',
-            '.floor::text'
-        ]
-        for selector in floor_selectors:
-            floor_info = response.css(selector).get()
-            if floor_info:
-                # Extract floor number and total floors from text like "3 av 5"
-                floor_parts = floor_info.strip().split()
-                if len(floor_parts) >= 1:
-                    loader.add_value('floor', floor_parts[0])
-                if len(floor_parts) >= 3:
-                    loader.add_value('total_floors', floor_parts[2])
-                break
+        floor_info = first_css(response, self.FLOOR_SEL)
+        if floor_info:
+            # Extract floor number and total floors from text like "3 av 5"
+            floor_parts = floor_info.strip().split()
+            if len(floor_parts) >= 1:
+                loader.add_value('floor', floor_parts[0])
+            if len(floor_parts) >= 3:
+                loader.add_value('total_floors', floor_parts[2])
 
         # Listing type (specific to Hemnet)
-        listing_type_selectors = [
-            '.property-info__type::text',
-            '[data-testid="property-type"]::text',
-            '.property-type::text'
-        ]
-        for selector in listing_type_selectors:
-            listing_type = response.css(selector).get()
-            if listing_type:
-                loader.add_value('listing_type', listing_type)
-                break
+        listing_type = first_css(response, self.LISTING_TYPE_SEL)
+        if listing_type:
+            loader.add_value('listing_type', listing_type)
 
-        yield loader.load_item()
+        return loader
 
     def _extract_hemnet_id(self, url):
         """Extract Hemnet ID from URL."""
-        try:
-            # Hemnet URLs typically look like: https://www.hemnet.se/bostad/lagenhet-3rum-sodermalm-stockholm-16012345
-            # The ID is usually at the end
-            parts = url.rstrip('/').split('-')
-            for part in reversed(parts):
-                if part.isdigit():
-                    return part
-        except Exception as e:
-            self.logger.warning(f'Could not extract Hemnet ID from URL {url}: {e}')
-        return None
+        # Hemnet URLs typically look like: https://www.hemnet.se/bostad/lagenhet-3rum-sodermalm-stockholm-16012345
+        # The ID is the trailing run of digits in the path, not the query string
+        m = _ID_RE.search(urlsplit(url).path)
+        return m.group(1) if m else None
 
@@ -0,0 +1,89 @@
+"""
+Small helpers shared by the spiders and pipelines.
+"""
+
+import re
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
+ELEVATOR_KEYWORDS = ('hiss', 'elevator', 'lift')
+BALCONY_KEYWORDS = ('balkong', 'balcony', 'terrass', 'terrace', 'uteplats', 'patio')
+
+_ELEVATOR = 1
+_BALCONY = 2
+
+if ahocorasick is not None:
+    # One automaton over both keyword sets, each keyword tagged with its feature bit
+    _FEATURE_AC = ahocorasick.Automaton()
+    for _keyword in ELEVATOR_KEYWORDS:
+        _FEATURE_AC.add_word(_keyword, _ELEVATOR)
+    for _keyword in BALCONY_KEYWORDS:
+        _FEATURE_AC.add_word(_keyword, _BALCONY)
+    _FEATURE_AC.make_automaton()
+else:
+    _FEATURE_AC = None
+
+# Plain substring alternations, so inflected forms such as "hissen" or
+# "balkongen" still match
+_ELEVATOR_RE = re.compile('|'.join(ELEVATOR_KEYWORDS))
+_BALCONY_RE = re.compile('|'.join(BALCONY_KEYWORDS))
+
+
+def first_css(response, selectors: Iterable[str]) -> Optional[str]:
+    """
+    Return the first non-empty value of the CSS selectors, tried in order.
+
+    An earlier selector wins even when a later one matches higher up the
+    page, which a CSS union of the same selectors would not guarantee.
+    """
+    for selector in selectors:
+        value = response.css(selector).get()
+        if value:
+            return value
+    return None
+
+
+def page_texts(response) -> Iterator[str]:
+    """
+    Lazily yield the text nodes of an HTML response.
+
+    Same nodes, in the same order, as response.css('*::text'), but streamed
+    straight from the lxml tree without building a Selector per node.
+    """
+    return response.selector.root.itertext()
+
+
+def detect_features(texts: Iterable[str]) -> Tuple[bool, bool]:
+    """
+    Look for elevator and balcony/patio keywords in a page's text nodes.
+
+    Fragments are lowercased and scanned one at a time, stopping as soon as
+    both features are found. Keywords never span text nodes, so this finds
+    the same matches as searching the joined page text. Each fragment is
+    scanned with pyahocorasick when it is installed, and one regex search
+    per missing feature otherwise.
+
+    Returns:
+        Tuple of (has_elevator, has_balcony)
+    """
+    both = _ELEVATOR | _BALCONY
+    flags = 0
+    for text in texts:
+        text = text.lower()
+        if _FEATURE_AC is not None:
+            for _, bit in _FEATURE_AC.iter(text):
+                flags |= bit
+                if flags == both:
+                    break
+        else:
+            if not flags & _ELEVATOR and _ELEVATOR_RE.search(text):
+                flags |= _ELEVATOR
+            if not flags & _BALCONY and _BALCONY_RE.search(text):
+                flags |= _BALCONY
+        if flags == both:
+            break
+    return bool(flags & _ELEVATOR), bool(flags & _BALCONY)
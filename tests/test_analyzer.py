@@ -1,23 +1,27 @@
 """
 Unit tests for the apartment analyzer business logic.
 """
+import os
+import tempfile
 import unittest
+from dataclasses import astuple
+
 import pandas as pd
 import numpy as np
-from unittest.mock import patch, MagicMock
 
-from pidgeon.analysis.analyzer import ApartmentAnalyzer
+from pidgeon.analysis.analyzer import ApartmentAnalyzer, ScoringWeights
 
 
 class TestApartmentAnalyzer(unittest.TestCase):
     """Test cases for ApartmentAnalyzer class."""
 
-    def setUp(self):
-        """Set up test fixtures before each test method."""
-        self.analyzer = ApartmentAnalyzer()
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures once for all test methods, the tests only read them."""
+        cls.analyzer = ApartmentAnalyzer()
 
         # Sample apartment data for testing
-        self.sample_data = pd.DataFrame({
+        cls.sample_data = pd.DataFrame({
             'address': ['Test St 1', 'Main Ave 2', 'Park Rd 3'],
             'price': [3000000, 4000000, 2500000],
             'fee': [3000, 4500, 2800],
@@ -36,174 +40,167 @@ class TestApartmentAnalyzer(unittest.TestCase):
 
     def test_analyzer_initialization(self):
         """Test that analyzer initializes with default weights."""
-        self.assertIsInstance(self.analyzer.weights, dict)
-        self.assertIn('price_weight', self.analyzer.weights)
-        self.assertIn('location_weight', self.analyzer.weights)
-        self.assertIn('size_weight', self.analyzer.weights)
+        self.assertIsInstance(self.analyzer.weights, ScoringWeights)
+        self.assertEqual(self.analyzer.weights, ScoringWeights())
 
     def test_custom_weights_initialization(self):
         """Test analyzer initialization with custom weights."""
-        custom_weights = {
-            'price_weight': 0.5,
-            'location_weight': 0.3,
-            'size_weight': 0.2
-        }
+        custom_weights = ScoringWeights(
+            price_weight=0.5, fee_weight=0.3, price_per_m2_weight=0.2,
+            rooms_weight=0.0, year_built_weight=0.0,
+            elevator_weight=0.0, balcony_weight=0.0
+        )
         analyzer = ApartmentAnalyzer(weights=custom_weights)
-        self.assertEqual(analyzer.weights['price_weight'], 0.5)
-        self.assertEqual(analyzer.weights['location_weight'], 0.3)
-        self.assertEqual(analyzer.weights['size_weight'], 0.2)
+        self.assertEqual(analyzer.weights.price_weight, 0.5)
+        self.assertEqual(analyzer.weights.fee_weight, 0.3)
+        self.assertEqual(analyzer.weights.price_per_m2_weight, 0.2)
 
     def test_calculate_price_score(self):
         """Test price score calculation."""
         # Price score should be inversely related to price
         # (lower price = higher score)
-        scores = self.analyzer._calculate_price_score(self.sample_data)
+        scores = self.sample_data['price'].map(self.analyzer.score_price)
 
         # Check that scores are between 0 and 1
-        self.assertTrue(all(0 <= score <= 1 for score in scores))
+        self.assertTrue(np.all((scores >= 0) & (scores <= 1)))
 
         # Check that cheaper apartments get higher scores
         cheapest_idx = self.sample_data['price'].idxmin()
         most_expensive_idx = self.sample_data['price'].idxmax()
         self.assertGreater(scores[cheapest_idx], scores[most_expensive_idx])
 
-    def test_calculate_location_score(self):
-        """Test location score calculation."""
-        scores = self.analyzer._calculate_location_score(self.sample_data)
+    def test_calculate_fee_score(self):
+        """Test fee score calculation."""
+        scores = self.sample_data['fee'].map(self.analyzer.score_fee)
 
         # Check that scores are between 0 and 1
-        self.assertTrue(all(0 <= score <= 1 for score in scores))
+        self.assertTrue(np.all((scores >= 0) & (scores <= 1)))
 
-        # Check that closer to transport gets higher scores
-        closest_metro_idx = self.sample_data['metro_distance'].idxmin()
-        farthest_metro_idx = self.sample_data['metro_distance'].idxmax()
-        self.assertGreaterEqual(scores[closest_metro_idx], scores[farthest_metro_idx])
+        # Check that lower fees get higher scores
+        lowest_fee_idx = self.sample_data['fee'].idxmin()
+        highest_fee_idx = self.sample_data['fee'].idxmax()
+        self.assertGreater(scores[lowest_fee_idx], scores[highest_fee_idx])
 
-    def test_calculate_size_score(self):
-        """Test size score calculation."""
-        scores = self.analyzer._calculate_size_score(self.sample_data)
+    def test_calculate_rooms_score(self):
+        """Test rooms score calculation."""
+        scores = self.sample_data['rooms'].map(self.analyzer.score_rooms)
 
         # Check that scores are between 0 and 1
-        self.assertTrue(all(0 <= score <= 1 for score in scores))
+        self.assertTrue(np.all((scores >= 0) & (scores <= 1)))
 
         # Check that larger apartments get higher scores
-        largest_idx = self.sample_data['living_area'].idxmax()
-        smallest_idx = self.sample_data['living_area'].idxmin()
+        largest_idx = self.sample_data['rooms'].idxmax()
+        smallest_idx = self.sample_data['rooms'].idxmin()
         self.assertGreater(scores[largest_idx], scores[smallest_idx])
 
     def test_calculate_amenity_score(self):
         """Test amenity score calculation."""
-        scores = self.analyzer._calculate_amenity_score(self.sample_data)
+        # Same apartment with and without elevator and balcony
+        apartment = self.sample_data.iloc[[0, 0]].reset_index(drop=True)
+        apartment['has_elevator'] = [True, False]
+        apartment['has_balcony'] = [True, False]
 
-        # Check that scores are between 0 and 1
-        self.assertTrue(all(0 <= score <= 1 for score in scores))
+        scores = self.analyzer.score_all(self.analyzer.clean_data(apartment))
 
         # Check that apartments with more amenities get higher scores
-        # (elevator + balcony should score higher than no amenities)
-        with_both_amenities = (self.sample_data['has_elevator'] &
-                              self.sample_data['has_balcony'])
-        with_no_amenities = (~self.sample_data['has_elevator'] &
-                            ~self.sample_data['has_balcony'])
-
-        if with_both_amenities.any() and with_no_amenities.any():
-            high_amenity_idx = with_both_amenities.idxmax()
-            low_amenity_idx = with_no_amenities.idxmax()
-            self.assertGreater(scores[high_amenity_idx], scores[low_amenity_idx])
+        self.assertGreater(scores[0], scores[1])
+        self.assertAlmostEqual(
+            scores[0] - scores[1],
+            (self.analyzer.weights.elevator_weight
+             + self.analyzer.weights.balcony_weight),
+            places=5
+        )
 
     def test_calculate_overall_score(self):
         """Test overall score calculation."""
-        result_df = self.analyzer.calculate_scores(self.sample_data)
+        result_df = self.analyzer.analyze_apartments(self.sample_data)
 
-        # Check that overall_score column exists
-        self.assertIn('overall_score', result_df.columns)
+        # Check that score column exists
+        self.assertIn('score', result_df.columns)
 
         # Check that scores are between 0 and 1
-        scores = result_df['overall_score']
-        self.assertTrue(all(0 <= score <= 1 for score in scores))
+        scores = result_df['score']
+        self.assertTrue(np.all((scores >= 0) & (scores <= 1)))
 
         # Check that all original columns are preserved
         for col in self.sample_data.columns:
             self.assertIn(col, result_df.columns)
 
-    def test_filter_by_price(self):
-        """Test filtering by price range."""
-        max_price = 3500000
-        filtered_df = self.analyzer.filter_apartments(
-            self.sample_data,
-            max_price=max_price
+    def test_score_all_applies_weights(self):
+        """Test that score_all weights each sub-score by ScoringWeights."""
+        price_only = ScoringWeights(
+            price_weight=1.0, fee_weight=0.0, price_per_m2_weight=0.0,
+            rooms_weight=0.0, year_built_weight=0.0,
+            elevator_weight=0.0, balcony_weight=0.0
         )
+        analyzer = ApartmentAnalyzer(weights=price_only)
+        df_clean = analyzer.clean_data(self.sample_data)
 
-        # Check that all apartments are within price range
-        self.assertTrue(all(filtered_df['price'] <= max_price))
-
-        # Check that expensive apartments are filtered out
-        expensive_count = len(self.sample_data[self.sample_data['price'] > max_price])
-        if expensive_count > 0:
-            self.assertLess(len(filtered_df), len(self.sample_data))
-
-    def test_filter_by_rooms(self):
-        """Test filtering by number of rooms."""
-        min_rooms = 2
-        max_rooms = 2
-        filtered_df = self.analyzer.filter_apartments(
-            self.sample_data,
-            min_rooms=min_rooms,
-            max_rooms=max_rooms
-        )
-
-        # Check that all apartments have correct number of rooms
-        self.assertTrue(all(filtered_df['rooms'] >= min_rooms))
-        self.assertTrue(all(filtered_df['rooms'] <= max_rooms))
+        scores = analyzer.score_all(df_clean)
+        expected = df_clean['price'].map(analyzer.score_price)
+        np.testing.assert_allclose(scores, expected, atol=1e-6)
 
-    def test_filter_by_fee(self):
-        """Test filtering by monthly fee."""
-        max_fee = 3500
-        filtered_df = self.analyzer.filter_apartments(
-            self.sample_data,
-            max_fee=max_fee
-        )
+    def test_vectorized_score_matches_row_score(self):
+        """Test that score_all agrees with scoring each row on its own."""
+        df_clean = self.analyzer.clean_data(self.sample_data)
 
-        # Check that all apartments are within fee range
-        self.assertTrue(all(filtered_df['fee'] <= max_fee))
+        scores = self.analyzer.score_all(df_clean)
+        expected = [self.analyzer.calculate_apartment_score(row)
+                    for _, row in df_clean.iterrows()]
+        self.assertEqual(scores.dtype, np.float64)
+        np.testing.assert_allclose(scores, expected, atol=1e-5)
 
     def test_sort_by_score(self):
         """Test sorting apartments by overall score."""
-        result_df = self.analyzer.calculate_scores(self.sample_data)
-        sorted_df = self.analyzer.sort_apartments(result_df)
+        sorted_df = self.analyzer.analyze_apartments(self.sample_data)
 
         # Check that apartments are sorted by score (descending)
-        scores = sorted_df['overall_score'].values
-        self.assertTrue(all(scores[i] >= scores[i+1] for i in range(len(scores)-1)))
+        scores = sorted_df['score'].values
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+        self.assertEqual(list(sorted_df['rank']), [1, 2, 3])
 
     def test_analyze_apartments_complete_workflow(self):
         """Test the complete analysis workflow."""
-        result_df = self.analyzer.analyze_apartments(
-            self.sample_data,
-            max_price=3500000,
-            min_rooms=1,
-            max_rooms=3
-        )
+        result_df = self.analyzer.analyze_apartments(self.sample_data)
 
         # Check that result has all required columns
-        expected_columns = ['overall_score', 'price_score', 'location_score',
-                           'size_score', 'amenity_score']
-        for col in expected_columns:
+        for col in ['score', 'rank']:
             self.assertIn(col, result_df.columns)
 
-        # Check that filtering worked
-        self.assertTrue(all(result_df['price'] <= 3500000))
-        self.assertTrue(all(result_df['rooms'] >= 1))
-        self.assertTrue(all(result_df['rooms'] <= 3))
+        # Check that every apartment was kept
+        self.assertEqual(len(result_df), len(self.sample_data))
 
         # Check that sorting worked (scores in descending order)
-        scores = result_df['overall_score'].values
-        self.assertTrue(all(scores[i] >= scores[i+1] for i in range(len(scores)-1)))
+        scores = result_df['score'].values
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_analyze_apartments_top_k(self):
+        """Test that analyze_apartments keeps only the top_k best apartments."""
+        full_df = self.analyzer.analyze_apartments(self.sample_data)
+        result_df = self.analyzer.analyze_apartments(self.sample_data, top_k=2)
+
+        self.assertEqual(len(result_df), 2)
+        self.assertEqual(list(result_df['address']), list(full_df['address'][:2]))
+        self.assertEqual(list(result_df['rank']), [1, 2])
+
+    def test_top_k(self):
+        """Test selecting the best apartments from a scored frame."""
+        result_df = self.analyzer.analyze_apartments(self.sample_data)
+
+        top = self.analyzer.top_k(result_df, 1)
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top['score'].iloc[0], result_df['score'].max())
+
+        # Asking for more than there are returns everything, sorted
+        self.assertEqual(len(self.analyzer.top_k(result_df, 10)), len(result_df))
 
     def test_handle_missing_data(self):
         """Test handling of missing data."""
         # Create data with missing values
         data_with_na = self.sample_data.copy()
-        data_with_na.loc[0, 'metro_distance'] = np.nan
+        data_with_na['price'] = data_with_na['price'].astype(float)
+        data_with_na.loc[0, 'price'] = np.nan
+        data_with_na['has_elevator'] = data_with_na['has_elevator'].astype(object)
         data_with_na.loc[1, 'has_elevator'] = np.nan
 
         # Should not raise an exception
@@ -211,7 +208,66 @@ class TestApartmentAnalyzer(unittest.TestCase):
 
         # Check that we get a valid result
         self.assertIsInstance(result_df, pd.DataFrame)
-        self.assertIn('overall_score', result_df.columns)
+        self.assertIn('score', result_df.columns)
+        self.assertFalse(result_df['score'].isna().any())
+
+    def test_clean_data_leaves_input_unchanged(self):
+        """Test that writing into the cleaned frame does not reach the input."""
+        df = self.sample_data.copy()
+        df['price'] = df['price'].astype(float)
+
+        df_clean = self.analyzer.clean_data(df)
+        df_clean.loc[0, 'price'] = 99.0
+        df_clean.loc[0, 'address'] = 'Changed'
+
+        self.assertEqual(df.loc[0, 'price'], 3000000.0)
+        self.assertEqual(df.loc[0, 'address'], 'Test St 1')
+
+    def test_load_data_keeps_text_columns_verbatim(self):
+        """Test that loading a scraped CSV does not reinterpret text columns."""
+        content = (
+            'url,source,address,price,rooms,year_built,housing_cooperative,scraped_at\n'
+            'https://x/1,hemnet,"A, st",3000000,2,1990,BRF A,2026-10-14T12:00:02\n'
+            'https://x/2,booli,B st,,3,,,2026-10-14T12:00:05\n'
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'apartments.csv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            df = self.analyzer.load_data(path)
+
+        self.assertEqual(list(df['scraped_at']),
+                         ['2026-10-14T12:00:02', '2026-10-14T12:00:05'])
+        self.assertEqual(df['address'].iloc[0], 'A, st')
+        self.assertTrue(pd.isna(df['housing_cooperative'].iloc[1]))
+        self.assertTrue(pd.isna(df['price'].iloc[1]))
+        self.assertEqual(df['price'].dtype, np.float64)
+
+    def test_export_results_format(self):
+        """Test the exact CSV written for analyzed results."""
+        df = pd.DataFrame({
+            'url': ['https://x/1', 'https://x/2'],
+            'address': ['A, st', 'B st'],
+            'price': [3000000.0, np.nan],
+            'rooms': [2.0, 3.0],
+            'year_built': pd.array([1990, None], dtype='Int16'),
+            'has_elevator': [True, False],
+            'scraped_at': ['2026-10-14T12:00:02', '2026-10-14T12:00:05'],
+            'score': [0.75, 0.5],
+            'rank': [1, 2],
+        })
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'results.csv')
+            self.analyzer.export_results(df, path)
+            with open(path, newline='', encoding='utf-8') as f:
+                content = f.read()
+
+        self.assertEqual(content, (
+            'rank,score,address,price,fee,price_per_m2,rooms,year_built,'
+            'url,has_elevator,scraped_at\n'
+            '1,0.75,"A, st",3000000.0,,,2.0,1990,https://x/1,True,2026-10-14T12:00:02\n'
+            '2,0.5,B st,,,,3.0,,https://x/2,False,2026-10-14T12:00:05\n'
+        ))
 
     def test_empty_dataframe(self):
         """Test handling of empty dataframe."""
@@ -223,19 +279,22 @@ class TestApartmentAnalyzer(unittest.TestCase):
 
     def test_invalid_weights_sum(self):
         """Test that weights are normalized if they don't sum to 1."""
-        weights = {
-            'price_weight': 0.8,
-            'location_weight': 0.6,
-            'size_weight': 0.4,
-            'amenity_weight': 0.2
-        }
+        weights = ScoringWeights(
+            price_weight=0.8,
+            fee_weight=0.6,
+            price_per_m2_weight=0.4,
+            rooms_weight=0.2
+        )
         analyzer = ApartmentAnalyzer(weights=weights)
 
         # Weights should be normalized to sum to 1
-        total_weight = sum(analyzer.weights.values())
+        total_weight = sum(astuple(analyzer.weights))
         self.assertAlmostEqual(total_weight, 1.0, places=5)
 
+        # Relative importance is kept
+        self.assertAlmostEqual(
+            analyzer.weights.price_weight / analyzer.weights.fee_weight, 0.8 / 0.6)
+
 
 if __name__ == '__main__':
     unittest.main()
-
@@ -0,0 +1,132 @@
+"""
+Unit tests for the Bloom filter used for URL de-duplication.
+"""
+import os
+from unittest.mock import Mock, call
+
+import pytest
+
+from pidgeon import dedup
+from pidgeon.dedup import BloomFilter, _HEADER
+
+
+def write_filter_file(path, magic, num_hashes=2, num_bits=64):
+    """Write an empty filter file by hand, as another process would."""
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(magic, num_hashes, num_bits))
+        f.truncate(_HEADER.size + (num_bits + 7) // 8)
+
+
+@pytest.fixture
+def filter_path(tmp_path):
+    return str(tmp_path / 'seen.bloom')
+
+
+class TestBloomFilter:
+    """Test cases for BloomFilter."""
+
+    def test_add_reports_seen_keys(self):
+        """Test that add returns whether the key was already present."""
+        bloom = BloomFilter(capacity=100)
+
+        assert bloom.add('https://example.com/apartment/1') is False
+        assert bloom.add('https://example.com/apartment/1') is True
+        assert 'https://example.com/apartment/1' in bloom
+        assert 'https://example.com/apartment/2' not in bloom
+
+    def test_reopened_file_keeps_keys(self, filter_path):
+        """Test that a file-backed filter remembers keys after reopening."""
+        bloom = BloomFilter(capacity=100, path=filter_path)
+        bloom.add('https://example.com/apartment/1')
+        bloom.close()
+
+        reopened = BloomFilter(capacity=100, path=filter_path)
+        assert 'https://example.com/apartment/1' in reopened
+        reopened.close()
+
+    def test_reopen_with_different_capacity_keeps_file_sizing(self, filter_path):
+        """Test that an existing file keeps the sizing it was created with."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.001, path=filter_path)
+        num_bits, num_hashes = bloom.num_bits, bloom.num_hashes
+        bloom.add('https://example.com/apartment/1')
+        bloom.close()
+
+        reopened = BloomFilter(capacity=10, error_rate=0.1, path=filter_path)
+        assert (reopened.num_bits, reopened.num_hashes) == (num_bits, num_hashes)
+        assert 'https://example.com/apartment/1' in reopened
+        reopened.close()
+
+    @pytest.mark.parametrize('content', [b'', b'PGBF', b'NOPE' + bytes(_HEADER.size)])
+    def test_invalid_file_raises_value_error(self, filter_path, content):
+        """Test that short files and unknown magic are rejected."""
+        with open(filter_path, 'wb') as f:
+            f.write(content)
+
+        with pytest.raises(ValueError, match='not a Bloom filter file'):
+            BloomFilter(path=filter_path)
+
+    def test_xxh3_file_without_xxhash_raises_value_error(self, filter_path,
+                                                         monkeypatch):
+        """Test that an XXH3 filter is not opened with another hash."""
+        write_filter_file(filter_path, b'PGX3')
+        # What the module sets up when xxhash is not installed
+        monkeypatch.setattr(dedup, '_DIGESTS', {b'PGBF': dedup._blake2b_128})
+        monkeypatch.setattr(dedup, '_DEFAULT_MAGIC', b'PGBF')
+
+        with pytest.raises(ValueError, match='install xxhash'):
+            BloomFilter(path=filter_path)
+
+    def test_blake2b_file_is_reopened_with_blake2b(self, filter_path, monkeypatch):
+        """Test that the file magic, not the installed packages, picks the hash."""
+        monkeypatch.setattr(dedup, '_DEFAULT_MAGIC', b'PGBF')
+        bloom = BloomFilter(capacity=100, path=filter_path)
+        bloom.add('https://example.com/apartment/1')
+        bloom.close()
+        monkeypatch.undo()
+
+        with open(filter_path, 'rb') as f:
+            assert f.read(4) == b'PGBF'
+        reopened = BloomFilter(capacity=100, path=filter_path)
+        assert reopened._digest is dedup._blake2b_128
+        assert 'https://example.com/apartment/1' in reopened
+        reopened.close()
+
+    def test_concurrent_creation_keeps_existing_file(self, filter_path, tmp_path,
+                                                     monkeypatch):
+        """Test that losing the creation race adopts the other process's file."""
+        def link_after_other_process(src, dst):
+            write_filter_file(dst, dedup._DEFAULT_MAGIC, num_hashes=2, num_bits=64)
+            raise FileExistsError(dst)
+
+        monkeypatch.setattr(dedup.os, 'link', link_after_other_process)
+        bloom = BloomFilter(capacity=1000, path=filter_path)
+
+        assert (bloom.num_hashes, bloom.num_bits) == (2, 64)
+        assert os.listdir(tmp_path) == ['seen.bloom']
+        bloom.close()
+
+    def test_file_backed_add_takes_file_lock(self, filter_path, monkeypatch):
+        """Test that adds to a file-backed filter hold an exclusive flock."""
+        mock_fcntl = Mock(LOCK_EX='LOCK_EX', LOCK_UN='LOCK_UN')
+        monkeypatch.setattr(dedup, 'fcntl', mock_fcntl)
+        bloom = BloomFilter(capacity=100, path=filter_path)
+        fileno = bloom._file.fileno()
+
+        bloom.add('https://example.com/apartment/1')
+
+        assert mock_fcntl.flock.call_args_list == [
+            call(fileno, 'LOCK_EX'), call(fileno, 'LOCK_UN')]
+        bloom.close()
+
+        BloomFilter(capacity=100).add('https://example.com/apartment/1')
+        assert mock_fcntl.flock.call_count == 2
+
+    def test_filters_on_same_file_share_keys(self, filter_path):
+        """Test that two filters mapping one file see each other's adds."""
+        first = BloomFilter(capacity=100, path=filter_path)
+        second = BloomFilter(capacity=100, path=filter_path)
+
+        assert first.add('https://example.com/apartment/1') is False
+        assert second.add('https://example.com/apartment/1') is True
+        first.close()
+        second.close()
@@ -1,332 +1,336 @@
 """
 Unit tests for the data processing pipelines.
 """
-import unittest
-import tempfile
-import os
 import csv
-from unittest.mock import Mock, patch, mock_open
-from scrapy import Item, Field
+import os
+import re
+from unittest.mock import Mock, patch
+
+import pytest
 from scrapy.exceptions import DropItem
 
-from pidgeon.pipelines import ValidationPipeline, DeduplicationPipeline, CSVExportPipeline
+from pidgeon.pipelines import (
+    ValidationPipeline, DuplicatesPipeline, CSVExportPipeline, _make_row_encoder,
+)
 from pidgeon.items import ApartmentItem
 
 
-class TestValidationPipeline(unittest.TestCase):
-    """Test cases for ValidationPipeline."""
+def make_item(**fields):
+    """Build an ApartmentItem that passes validation, overridden by fields."""
+    item = ApartmentItem()
+    item['address'] = 'Test Street 123'
+    item['price'] = 3000000
+    item['url'] = 'https://example.com/apartment/123'
+    item['source'] = 'hemnet'
+    for name, value in fields.items():
+        item[name] = value
+    return item
+
+
+@pytest.fixture(scope='module')
+def spider():
+    spider = Mock()
+    spider.name = 'test_spider'
+    return spider
+
+
+@pytest.fixture(scope='module')
+def validation():
+    # Stateless, one instance serves every test in the module
+    return ValidationPipeline()
+
+
+@pytest.fixture
+def dedup():
+    return DuplicatesPipeline()
+
+
+@pytest.fixture
+def csv_export(tmp_path, spider):
+    pipeline = CSVExportPipeline()
+    pipeline.output_dir = str(tmp_path)
+    yield pipeline
+    # Stop the writer thread of tests that leave the spider open
+    pipeline.close_spider(spider)
 
-    def setUp(self):
-        """Set up test fixtures before each test method."""
-        self.pipeline = ValidationPipeline()
-        self.spider = Mock()
-        self.spider.name = 'test_spider'
 
-    def test_valid_item_passes_through(self):
+class TestValidationPipeline:
+    """Test cases for ValidationPipeline."""
+
+    def test_valid_item_passes_through(self, validation, spider):
         """Test that valid items pass through validation."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = 3000000
-        item['url'] = 'https://example.com/apartment/123'
+        item = make_item()
 
-        result = self.pipeline.process_item(item, self.spider)
-        self.assertEqual(result, item)
+        result = validation.process_item(item, spider)
+        assert result == item
 
-    def test_missing_required_field_raises_drop_item(self):
+    @pytest.mark.parametrize('field', ValidationPipeline.required_fields)
+    def test_missing_required_field_raises_drop_item(self, validation, spider, field):
         """Test that missing required fields cause item to be dropped."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        # Missing price and url
-
-        with self.assertRaises(DropItem):
-            self.pipeline.process_item(item, self.spider)
-
-    def test_invalid_price_type_raises_drop_item(self):
-        """Test that invalid price types cause item to be dropped."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = 'not a number'  # Invalid type
-        item['url'] = 'https://example.com/apartment/123'
-
-        with self.assertRaises(DropItem):
-            self.pipeline.process_item(item, self.spider)
-
-    def test_negative_price_raises_drop_item(self):
-        """Test that negative prices cause item to be dropped."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = -1000000  # Invalid value
-        item['url'] = 'https://example.com/apartment/123'
-
-        with self.assertRaises(DropItem):
-            self.pipeline.process_item(item, self.spider)
-
-    def test_invalid_url_raises_drop_item(self):
-        """Test that invalid URLs cause item to be dropped."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = 3000000
-        item['url'] = 'not-a-valid-url'  # Invalid URL
-
-        with self.assertRaises(DropItem):
-            self.pipeline.process_item(item, self.spider)
-
-    def test_invalid_rooms_type_raises_drop_item(self):
-        """Test that invalid room numbers cause item to be dropped."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = 3000000
-        item['url'] = 'https://example.com/apartment/123'
-        item['rooms'] = 'two'  # Invalid type
-
-        with self.assertRaises(DropItem):
-            self.pipeline.process_item(item, self.spider)
-
-    def test_optional_fields_with_invalid_types(self):
+        item = make_item()
+        del item[field]
+
+        with pytest.raises(DropItem):
+            validation.process_item(item, spider)
+
+    @pytest.mark.parametrize('field,value,should_drop', [
+        ('price', 'not a number', True),     # Invalid type
+        ('price', -1000000, True),           # Invalid value
+        ('price', '3 250 000', False),       # Scraped string is parsed
+        ('url', 'not-a-valid-url', True),    # Invalid URL
+        ('url', 'ftp://example.com/1', True),
+        ('rooms', 'two', True),              # Invalid type
+        ('rooms', 3, False),
+        ('fee', -100, True),                 # Invalid value
+        ('fee', 4500, False),
+    ])
+    def test_field_validation(self, validation, spider, field, value, should_drop):
+        """Test which field values cause the item to be dropped."""
+        item = make_item(**{field: value})
+
+        if should_drop:
+            with pytest.raises(DropItem):
+                validation.process_item(item, spider)
+        else:
+            assert validation.process_item(item, spider) is item
+
+    def test_scraped_price_is_stored_as_int(self, validation, spider):
+        """Test that a parsed price is stored back for later pipelines."""
+        item = make_item(price='3 250 000')
+
+        result = validation.process_item(item, spider)
+        assert result['price'] == 3250000
+
+    def test_optional_fields_with_invalid_types(self, validation, spider):
         """Test that optional fields with invalid types are cleaned."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = 3000000
-        item['url'] = 'https://example.com/apartment/123'
-        item['has_elevator'] = 'yes'  # Should be boolean
-        item['floor'] = 'ground'  # Should be number
+        # Should be boolean and number
+        item = make_item(has_elevator='yes', floor='ground')
 
-        result = self.pipeline.process_item(item, self.spider)
+        result = validation.process_item(item, spider)
 
         # Should pass validation but clean invalid optional fields
-        self.assertEqual(result['address'], 'Test Street 123')
-        self.assertEqual(result['price'], 3000000)
-        self.assertEqual(result['url'], 'https://example.com/apartment/123')
-
+        assert result['address'] == 'Test Street 123'
+        assert result['price'] == 3000000
+        assert result['url'] == 'https://example.com/apartment/123'
 
-class TestDeduplicationPipeline(unittest.TestCase):
-    """Test cases for DeduplicationPipeline."""
 
-    def setUp(self):
-        """Set up test fixtures before each test method."""
-        self.pipeline = DeduplicationPipeline()
-        self.spider = Mock()
-        self.spider.name = 'test_spider'
+class TestDuplicatesPipeline:
+    """Test cases for DuplicatesPipeline."""
 
-    def test_first_item_passes_through(self):
+    def test_first_item_passes_through(self, dedup, spider):
         """Test that the first item with a URL passes through."""
-        item = ApartmentItem()
-        item['url'] = 'https://example.com/apartment/123'
-        item['address'] = 'Test Street 123'
+        item = make_item()
 
-        result = self.pipeline.process_item(item, self.spider)
-        self.assertEqual(result, item)
+        result = dedup.process_item(item, spider)
+        assert result == item
 
-    def test_duplicate_url_raises_drop_item(self):
+    def test_duplicate_url_raises_drop_item(self, dedup, spider):
         """Test that duplicate URLs cause item to be dropped."""
-        item1 = ApartmentItem()
-        item1['url'] = 'https://example.com/apartment/123'
-        item1['address'] = 'Test Street 123'
-
-        item2 = ApartmentItem()
-        item2['url'] = 'https://example.com/apartment/123'  # Same URL
-        item2['address'] = 'Test Street 456'  # Different address
+        item1 = make_item()
+        item2 = make_item(address='Test Street 456')  # Same URL, different address
 
         # First item should pass
-        result1 = self.pipeline.process_item(item1, self.spider)
-        self.assertEqual(result1, item1)
+        assert dedup.process_item(item1, spider) == item1
 
         # Second item with same URL should be dropped
-        with self.assertRaises(DropItem):
-            self.pipeline.process_item(item2, self.spider)
+        with pytest.raises(DropItem):
+            dedup.process_item(item2, spider)
 
-    def test_different_urls_both_pass(self):
+    def test_different_urls_both_pass(self, dedup, spider):
         """Test that items with different URLs both pass through."""
-        item1 = ApartmentItem()
-        item1['url'] = 'https://example.com/apartment/123'
-        item1['address'] = 'Test Street 123'
-
-        item2 = ApartmentItem()
-        item2['url'] = 'https://example.com/apartment/456'  # Different URL
-        item2['address'] = 'Test Street 456'
+        item1 = make_item()
+        item2 = make_item(url='https://example.com/apartment/456',
+                          address='Test Street 456')
 
         # Both items should pass
-        result1 = self.pipeline.process_item(item1, self.spider)
-        result2 = self.pipeline.process_item(item2, self.spider)
-
-        self.assertEqual(result1, item1)
-        self.assertEqual(result2, item2)
+        assert dedup.process_item(item1, spider) == item1
+        assert dedup.process_item(item2, spider) == item2
 
-    def test_missing_url_passes_through(self):
+    def test_missing_url_passes_through(self, dedup, spider):
         """Test that items without URL pass through (validation should catch this)."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        # No URL field
+        item = make_item()
+        del item['url']
 
         # Should pass through deduplication (validation pipeline should handle missing URL)
-        result = self.pipeline.process_item(item, self.spider)
-        self.assertEqual(result, item)
+        assert dedup.process_item(item, spider) == item
 
+    def test_no_false_duplicates_within_a_run(self, spider):
+        """Test that distinct URLs are never dropped, whatever the filter sizing."""
+        pipeline = DuplicatesPipeline(capacity=10, error_rate=0.5)
 
-class TestCSVExportPipeline(unittest.TestCase):
-    """Test cases for CSVExportPipeline."""
+        for i in range(5000):
+            item = make_item(url=f'https://example.com/apartment/{i}')
+            pipeline.process_item(item, spider)
+
+        with pytest.raises(DropItem):
+            item = make_item(url='https://example.com/apartment/42')
+            pipeline.process_item(item, spider)
+
+    def test_persisted_filter_survives_restart(self, tmp_path, spider):
+        """Test that a file-backed filter remembers URLs from an earlier run."""
+        path = str(tmp_path / 'seen.bloom')
+        item = make_item()
 
-    def setUp(self):
-        """Set up test fixtures before each test method."""
-        self.temp_dir = tempfile.mkdtemp()
-        self.pipeline = CSVExportPipeline()
-        self.spider = Mock()
-        self.spider.name = 'test_spider'
+        first_run = DuplicatesPipeline(capacity=1000, path=path)
+        first_run.open_spider(spider)
+        first_run.process_item(item, spider)
+        first_run.close_spider(spider)
 
-    def tearDown(self):
-        """Clean up test fixtures after each test method."""
-        # Clean up any files created during tests
-        if hasattr(self.pipeline, 'file'):
-            self.pipeline.file.close()
+        second_run = DuplicatesPipeline(capacity=1000, path=path)
+        second_run.open_spider(spider)
+        with pytest.raises(DropItem):
+            second_run.process_item(make_item(), spider)
+        second_run.close_spider(spider)
+
+
+class TestCSVExportPipeline:
+    """Test cases for CSVExportPipeline."""
 
     @patch('pidgeon.pipelines.datetime')
-    def test_open_spider_creates_file(self, mock_datetime):
+    def test_open_spider_creates_file(self, mock_datetime, csv_export, spider,
+                                      tmp_path):
         """Test that opening spider creates CSV file with correct name."""
         mock_datetime.now.return_value.strftime.return_value = '20231201_120000'
+        csv_export.output_dir = str(tmp_path / 'output')
 
-        with patch('builtins.open', mock_open()) as mock_file:
-            with patch('os.makedirs') as mock_makedirs:
-                self.pipeline.open_spider(self.spider)
-
-                # Check that output directory is created
-                mock_makedirs.assert_called_once_with('output', exist_ok=True)
+        csv_export.open_spider(spider)
 
-                # Check that file is opened with correct name
-                expected_filename = 'output/apartments_test_spider_20231201_120000.csv'
-                mock_file.assert_called_once_with(expected_filename, 'w', newline='', encoding='utf-8')
+        # Check that output directory and file are created
+        expected_filename = (tmp_path / 'output'
+                             / 'apartments_test_spider_20231201_120000.csv')
+        assert expected_filename.is_file()
 
-    def test_process_item_writes_to_csv(self):
+    def test_process_item_writes_to_csv(self, csv_export, spider, tmp_path):
         """Test that processing item writes data to CSV."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = 3000000
-        item['url'] = 'https://example.com/apartment/123'
-
-        # Mock the file and CSV writer
-        mock_file = Mock()
-        mock_writer = Mock()
+        item = make_item()
 
-        self.pipeline.file = mock_file
-        self.pipeline.writer = mock_writer
-
-        result = self.pipeline.process_item(item, self.spider)
+        csv_export.open_spider(spider)
+        result = csv_export.process_item(item, spider)
 
         # Check that item is returned unchanged
-        self.assertEqual(result, item)
-
-        # Check that writer.writerow was called
-        mock_writer.writerow.assert_called_once()
-
-    def test_close_spider_closes_file(self):
+        assert result == item
+
+        # Rows are written in batches, closing the spider writes the rest
+        csv_export.close_spider(spider)
+        [filename] = os.listdir(tmp_path)
+        with open(tmp_path / filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 1
+        assert rows[0]['address'] == 'Test Street 123'
+        assert rows[0]['price'] == '3000000'
+
+    def test_close_spider_closes_file(self, csv_export, spider):
         """Test that closing spider closes the file."""
-        mock_file = Mock()
-        self.pipeline.file = mock_file
+        csv_export.open_spider(spider)
+        f = csv_export.files[spider]
 
-        self.pipeline.close_spider(self.spider)
+        csv_export.close_spider(spider)
 
-        # Check that file is closed
-        mock_file.close.assert_called_once()
+        # Check that file is closed and the spider forgotten
+        assert f.closed
+        assert spider not in csv_export.files
 
-    @patch('pidgeon.pipelines.datetime')
-    @patch('builtins.open', mock_open())
-    @patch('os.makedirs')
-    def test_csv_header_written_correctly(self, mock_makedirs, mock_datetime):
+    def test_csv_header_written_correctly(self, csv_export, spider, tmp_path):
         """Test that CSV header is written with correct field names."""
-        mock_datetime.now.return_value.strftime.return_value = '20231201_120000'
-
-        with patch('csv.DictWriter') as mock_dict_writer:
-            mock_writer_instance = Mock()
-            mock_dict_writer.return_value = mock_writer_instance
-
-            self.pipeline.open_spider(self.spider)
-
-            # Check that DictWriter was initialized with correct fieldnames
-            mock_dict_writer.assert_called_once()
-            args, kwargs = mock_dict_writer.call_args
-            self.assertIn('fieldnames', kwargs)
+        csv_export.open_spider(spider)
+        csv_export.close_spider(spider)
 
-            # Check that writeheader was called
-            mock_writer_instance.writeheader.assert_called_once()
+        [filename] = os.listdir(tmp_path)
+        with open(tmp_path / filename, newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f))
+        assert header == list(CSVExportPipeline.FIELDS)
 
     def test_item_data_extraction(self):
         """Test that item data is correctly extracted for CSV writing."""
-        item = ApartmentItem()
-        item['address'] = 'Test Street 123'
-        item['price'] = 3000000
-        item['fee'] = 4500
-        item['rooms'] = 2
-        item['url'] = 'https://example.com/apartment/123'
+        item = make_item(fee=4500, rooms=2, has_elevator=True)
 
-        # Mock the writer
-        mock_writer = Mock()
-        self.pipeline.writer = mock_writer
-        self.pipeline.file = Mock()  # Prevent close() errors
+        encode = _make_row_encoder(CSVExportPipeline.FIELDS)
+        row = dict(zip(CSVExportPipeline.FIELDS, encode(item)))
 
-        self.pipeline.process_item(item, self.spider)
+        # Rows are lists in FIELDS order, missing fields are written empty
+        assert list(row) == list(ApartmentItem.fields)
+        assert row['address'] == 'Test Street 123'
+        assert row['price'] == '3000000'
+        assert row['fee'] == '4500'
+        assert row['rooms'] == '2'
+        assert row['has_elevator'] == 'Yes'
+        assert row['year_built'] == ''
 
-        # Check that writerow was called with item data
-        mock_writer.writerow.assert_called_once_with(dict(item))
-
-    @patch('pidgeon.pipelines.datetime')
-    def test_filename_format(self, mock_datetime):
+    def test_filename_format(self, csv_export, spider, tmp_path):
         """Test that filename follows the correct format."""
-        mock_datetime.now.return_value.strftime.return_value = '20231201_120000'
-
-        with patch('builtins.open', mock_open()):
-            with patch('os.makedirs'):
-                with patch('csv.DictWriter'):
-                    self.pipeline.open_spider(self.spider)
-
-                    expected_pattern = 'output/apartments_test_spider_20231201_120000.csv'
-                    # The filename should be stored or accessible somehow
-                    # This test verifies the format is correct
-
-
-class TestPipelineIntegration(unittest.TestCase):
+        csv_export.open_spider(spider)
+
+        [filename] = os.listdir(tmp_path)
+        assert re.fullmatch(r'apartments_test_spider_\d{8}_\d{6}\.csv', filename)
+
+    def test_unencodable_text_is_replaced(self, csv_export, spider, tmp_path):
+        """Test that a lone surrogate is written as '?' instead of failing the batch."""
+        csv_export.open_spider(spider)
+        csv_export.process_item(make_item(address='Test Street \ud800'), spider)
+        csv_export.close_spider(spider)
+
+        [filename] = os.listdir(tmp_path)
+        with open(tmp_path / filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert rows[0]['address'] == 'Test Street ?'
+
+    def test_failed_batch_is_logged_and_skipped(self, tmp_path):
+        """Test that the writer thread keeps draining after a batch fails."""
+        spider = Mock()
+        spider.name = 'test_spider'
+        pipeline = CSVExportPipeline()
+        pipeline.output_dir = str(tmp_path)
+        pipeline.QUEUE_SIZE = 2
+
+        with patch('pidgeon.pipelines.csv.writer') as mock_writer:
+            mock_writer.return_value.writerows.side_effect = ValueError('boom')
+            pipeline.open_spider(spider)
+            # More items than the queue holds, so this only returns if rows are consumed
+            for i in range(10):
+                item = make_item(url=f'https://example.com/apartment/{i}')
+                pipeline.process_item(item, spider)
+            pipeline.close_spider(spider)
+
+        spider.logger.error.assert_called()
+        assert spider not in pipeline.files
+
+    def test_stopped_writer_raises_instead_of_blocking(self, csv_export, spider):
+        """Test that process_item notices a writer thread that has stopped."""
+        csv_export.QUEUE_SIZE = 1
+        csv_export.open_spider(spider)
+        csv_export.queues[spider].put(None)
+        csv_export.writer_threads[spider].join()
+
+        with pytest.raises(RuntimeError):
+            for _ in range(3):
+                csv_export.process_item(make_item(), spider)
+
+
+class TestPipelineIntegration:
     """Integration tests for pipeline combinations."""
 
-    def setUp(self):
-        """Set up test fixtures before each test method."""
-        self.validation_pipeline = ValidationPipeline()
-        self.dedup_pipeline = DeduplicationPipeline()
-        self.spider = Mock()
-        self.spider.name = 'test_spider'
-
-    def test_validation_then_deduplication(self):
+    def test_validation_then_deduplication(self, validation, dedup, spider):
         """Test that validation and deduplication work together."""
         # Valid item that should pass both pipelines
-        item1 = ApartmentItem()
-        item1['address'] = 'Test Street 123'
-        item1['price'] = 3000000
-        item1['url'] = 'https://example.com/apartment/123'
+        item1 = make_item()
 
         # Invalid item that should fail validation
-        item2 = ApartmentItem()
-        item2['address'] = 'Test Street 456'
-        item2['price'] = 'invalid'  # Invalid price
-        item2['url'] = 'https://example.com/apartment/456'
+        item2 = make_item(address='Test Street 456', price='invalid',
+                          url='https://example.com/apartment/456')
 
         # Duplicate item that should pass validation but fail deduplication
-        item3 = ApartmentItem()
-        item3['address'] = 'Test Street 789'
-        item3['price'] = 4000000
-        item3['url'] = 'https://example.com/apartment/123'  # Same URL as item1
+        item3 = make_item(address='Test Street 789', price=4000000)  # Same URL as item1
 
         # First item should pass both pipelines
-        result1 = self.validation_pipeline.process_item(item1, self.spider)
-        result1 = self.dedup_pipeline.process_item(result1, self.spider)
-        self.assertEqual(result1, item1)
+        result1 = validation.process_item(item1, spider)
+        result1 = dedup.process_item(result1, spider)
+        assert result1 == item1
 
         # Second item should fail validation
-        with self.assertRaises(DropItem):
-            self.validation_pipeline.process_item(item2, self.spider)
+        with pytest.raises(DropItem):
+            validation.process_item(item2, spider)
 
         # Third item should pass validation but fail deduplication
-        result3 = self.validation_pipeline.process_item(item3, self.spider)
-        with self.assertRaises(DropItem):
-            self.dedup_pipeline.process_item(result3, self.spider)
-
-
-if __name__ == '__main__':
-    unittest.main()
-
+        result3 = validation.process_item(item3, spider)
+        with pytest.raises(DropItem):
+            dedup.process_item(result3, spider)
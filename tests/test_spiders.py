@@ -0,0 +1,101 @@
+"""
+Unit tests for the listing detail page parsing of the spiders.
+"""
+import pytest
+from scrapy.http import HtmlResponse
+
+from pidgeon.spiders.booli import BooliSpider
+from pidgeon.spiders.hemnet import HemnetSpider
+
+
+def make_response(url, body):
+    return HtmlResponse(url=url, body=body.encode('utf-8'), encoding='utf-8')
+
+
+@pytest.fixture(scope='module')
+def hemnet():
+    spider = HemnetSpider()
+    yield spider
+    spider.closed('finished')
+
+
+@pytest.fixture(scope='module')
+def booli():
+    spider = BooliSpider()
+    yield spider
+    spider.closed('finished')
+
+
+class TestHemnetSpider:
+    """Test cases for HemnetSpider detail page parsing."""
+
+    def test_specific_selector_wins_over_earlier_generic_match(self, hemnet):
+        """Test that selectors keep their priority, not their document order."""
+        response = make_response(
+            'https://www.hemnet.se/bostad/lagenhet-2rum-sodermalm-stockholm-16012345',
+            '<html><body>'
+            '<div class="price">999 kr</div>'
+            '<div class="floor">1</div>'
+            '<h1 class="property-address">Storgatan 1</h1>'
+            '<div class="property-info__price">3000000 kr</div>'
+            '<div class="property-info__floor">3 av 5</div>'
+            '</body></html>'
+        )
+
+        item = hemnet._populate_loader(response).load_item()
+
+        assert item['price'] == 3000000
+        assert item['floor'] == 3
+        assert item['total_floors'] == 5
+        assert item['address'] == 'Storgatan 1'
+
+    def test_generic_selector_is_used_as_fallback(self, hemnet):
+        """Test that a later selector is used when the earlier ones match nothing."""
+        response = make_response(
+            'https://www.hemnet.se/bostad/lagenhet-2rum-sodermalm-stockholm-16012345',
+            '<html><body><div class="price">2500000 kr</div></body></html>'
+        )
+
+        item = hemnet._populate_loader(response).load_item()
+
+        assert item['price'] == 2500000
+
+
+class TestBooliSpider:
+    """Test cases for BooliSpider detail page parsing."""
+
+    def test_specific_selector_wins_over_earlier_generic_match(self, booli):
+        """Test that selectors keep their priority, not their document order."""
+        response = make_response(
+            'https://www.booli.se/bostad/lagenhet-stockholm-1234567',
+            '<html><body>'
+            '<div class="rooms">9</div>'
+            '<div class="status">Okänd</div>'
+            '<div class="property-rooms">2</div>'
+            '<div class="listing-status">Såld</div>'
+            '</body></html>'
+        )
+
+        item = booli._populate_loader(response).load_item()
+
+        assert item['rooms'] == 2
+        assert item['listing_status'] == 'Såld'
+
+    def test_structured_data_only_fills_missing_fields(self, booli):
+        """Test that JSON-LD values do not override fields found by the selectors."""
+        response = make_response(
+            'https://www.booli.se/bostad/lagenhet-stockholm-1234567',
+            '<html><body>'
+            '<h1 class="property-title">Storgatan 1</h1>'
+            '<script type="application/ld+json">'
+            '{"@type": "RealEstateListing", "name": "Annan gata 2",'
+            ' "offers": {"price": 4100000}, "numberOfRooms": 3}'
+            '</script>'
+            '</body></html>'
+        )
+
+        item = booli._populate_loader(response).load_item()
+
+        assert item['address'] == 'Storgatan 1'
+        assert item['price'] == 4100000
+        assert item['rooms'] == 3
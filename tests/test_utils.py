@@ -0,0 +1,94 @@
+"""
+Unit tests for the helpers shared by the spiders and pipelines.
+"""
+import pytest
+from scrapy.http import HtmlResponse
+
+from pidgeon import utils
+from pidgeon.utils import detect_features, page_texts
+
+
+LISTING_HTML = b"""
+<html><body>
+  <h1>Storgatan 1</h1>
+  <ul class="features">
+    <li>Hiss</li><li>Inglasad <b>balkong</b> mot g\xc3\xa5rden</li>
+  </ul>
+  <p>Byggt 1932, <i>renoverat</i> 2019</p>
+</body></html>
+"""
+
+
+def make_response(body=LISTING_HTML):
+    return HtmlResponse(url='https://example.com/apartment/1', body=body,
+                        encoding='utf-8')
+
+
+@pytest.fixture(params=['aho-corasick', 'regex'])
+def matcher(request, monkeypatch):
+    """Run a test with the Aho-Corasick automaton and with the regex fallback."""
+    if request.param == 'aho-corasick':
+        if utils._FEATURE_AC is None:
+            pytest.skip('pyahocorasick is not installed')
+    else:
+        monkeypatch.setattr(utils, '_FEATURE_AC', None)
+    return request.param
+
+
+class TestDetectFeatures:
+    """Test cases for detect_features."""
+
+    @pytest.mark.parametrize('texts,expected', [
+        (['Hiss finns i huset'], (True, False)),
+        (['Stor balkong i söderläge'], (False, True)),
+        (['Hissen renoverades 2019', 'Balkongen vetter mot gården'], (True, True)),
+        (['Inglasad terrass'], (False, True)),
+        (['Gemensam uteplats'], (False, True)),
+        (['Building with ELEVATOR and a Balcony'], (True, True)),
+        (['Lift'], (True, False)),
+        (['Liten patio'], (False, True)),
+        (['Trerummare med öppen planlösning'], (False, False)),
+        ([], (False, False)),
+    ])
+    def test_keywords(self, matcher, texts, expected):
+        """Test Swedish and English keywords, inflected forms and casing."""
+        assert detect_features(texts) == expected
+
+    def test_matches_are_the_same_on_both_paths(self, monkeypatch):
+        """Test that the automaton and the regex fallback agree on every keyword."""
+        if utils._FEATURE_AC is None:
+            pytest.skip('pyahocorasick is not installed')
+        keywords = utils.ELEVATOR_KEYWORDS + utils.BALCONY_KEYWORDS
+        samples = [f'Fin {keyword}en' for keyword in keywords]
+        samples += ['Ingen hiss', 'Balkong och hiss', 'Vindsvåning', '']
+
+        with_automaton = [detect_features([text]) for text in samples]
+        monkeypatch.setattr(utils, '_FEATURE_AC', None)
+        with_regex = [detect_features([text]) for text in samples]
+
+        assert with_automaton == with_regex
+
+    def test_stops_reading_once_both_features_are_found(self, matcher):
+        """Test that the scan does not consume text nodes it no longer needs."""
+        texts = iter(['Hiss', 'Balkong', 'Byggt 1932', 'Renoverat 2019'])
+
+        assert detect_features(texts) == (True, True)
+        assert list(texts) == ['Byggt 1932', 'Renoverat 2019']
+
+    def test_detects_features_in_page_texts(self, matcher):
+        """Test detect_features on the text nodes of a listing page."""
+        assert detect_features(page_texts(make_response())) == (True, True)
+
+
+class TestPageTexts:
+    """Test cases for page_texts."""
+
+    def test_same_nodes_as_css_text(self):
+        """Test that page_texts yields the nodes of response.css('*::text') in order."""
+        response = make_response()
+
+        assert list(page_texts(response)) == response.css('*::text').getall()
+
+    def test_non_ascii_text_is_decoded(self):
+        """Test that Swedish characters come through as text."""
+        assert ' mot gården' in list(page_texts(make_response()))